@@ -40,10 +40,34 @@ def build_ncaa_raw_pipeline_tasks():
         payload["date"] = ctx["ds_nodash"]
         return invoke_function(url, params=payload)
 
+    @task
+    def load_real_tables(payload: dict) -> dict:
+        """promote the new raw games to real_deal so Elo can see them"""
+        url = "https://us-central1-baratz00-ba882-fall25.cloudfunctions.net/load_real_tables"
+        ctx = get_current_context()
+        payload["run_id"] = ctx["dag_run"].run_id
+        payload["date"] = ctx["ds_nodash"]
+        return invoke_function(url, params=payload)
+
+    @task
+    def elo_ratings(payload: dict) -> dict:
+        """apply only the newly completed games to bt.elo_ratings"""
+        url = "https://us-central1-baratz00-ba882-fall25.cloudfunctions.net/elo-ratings"
+        return invoke_function(url)
+
+    @task
+    def team_stats_adjusted(payload: dict) -> dict:
+        """re-solve the opponent-adjusted team stats with the new games"""
+        url = "https://us-central1-baratz00-ba882-fall25.cloudfunctions.net/team-stats-adjusted"
+        return invoke_function(url)
+
     s = schema()
     e = extract_event_info(s)
     p = parsing_sb_g_info(e)
     r = ranking(p)
+    l = load_real_tables(p)
+    elo_ratings(l)
+    team_stats_adjusted(l)
     return r
 
 # setting time zone and backfill start time
@@ -99,6 +99,228 @@ CREATE TABLE IF NOT EXISTS bt.model_ranking_history (
     PRIMARY KEY(team_id, updated_at)
 );
 
+-- 4b. Solver runs (iteration counts for warm vs cold starts)
+CREATE TABLE IF NOT EXISTS bt.model_runs (
+    updated_at TIMESTAMP NOT NULL PRIMARY KEY,  -- matches model_ranking_history.updated_at
+    solver VARCHAR,
+    warm_started BOOLEAN,
+    iterations INTEGER,
+    num_teams INTEGER,
+    num_games INTEGER
+);
+
+-- Recency half-life of the run (NULL = no decay)
+ALTER TABLE bt.model_runs ADD COLUMN IF NOT EXISTS half_life_days DOUBLE;
+
+-- artifacts.data_version() of the input, so warm and cold solves are only
+-- compared on the same data
+ALTER TABLE bt.model_runs ADD COLUMN IF NOT EXISTS data_version VARCHAR;
+
+-- Iterations of a cold solve on the same input, measured in-process by
+-- warm-started runs that had no stored cold baseline
+ALTER TABLE bt.model_runs ADD COLUMN IF NOT EXISTS cold_iterations INTEGER;
+
+-- Full-precision BT log-strengths of each run, the warm start for the next
+-- run with the same half-life (rankings tables only keep FLOAT strengths)
+CREATE TABLE IF NOT EXISTS bt.model_run_params (
+    updated_at TIMESTAMP NOT NULL,  -- matches model_runs.updated_at
+    team_id INT NOT NULL,
+    log_strength DOUBLE NOT NULL,
+    PRIMARY KEY(updated_at, team_id)
+);
+
+-- 4c. Per-season rankings (batch multi-season runner)
+CREATE TABLE IF NOT EXISTS bt.season_rankings (
+    season INTEGER NOT NULL,
+    team_id INT NOT NULL,
+    rank INT,
+    strength FLOAT NOT NULL,
+    prob_vs_avg FLOAT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY(season, team_id)
+);
+
+-- 4d. Bootstrap percentile bands (95%) for each ranked team
+CREATE TABLE IF NOT EXISTS bt.ranking_intervals (
+    team_id INT NOT NULL,
+    strength_lower FLOAT,
+    strength_median FLOAT,
+    strength_upper FLOAT,
+    rank_best FLOAT,
+    rank_median FLOAT,
+    rank_worst FLOAT,
+    n_boot INTEGER,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,  -- matches model_ranking_history.updated_at
+    PRIMARY KEY(team_id, updated_at)
+);
+
+-- 4e. Monte Carlo rest-of-season simulations from BT strengths
+CREATE TABLE IF NOT EXISTS bt.season_simulations (
+    season INTEGER NOT NULL,
+    team_id INT NOT NULL,
+    current_wins INTEGER,
+    expected_wins FLOAT,
+    prob_top4 FLOAT,
+    prob_conf_title FLOAT,  -- NULL when no conference mapping was supplied
+    n_sims INTEGER,
+    as_of TIMESTAMP,  -- games after this were simulated
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY(season, team_id, updated_at)
+);
+
+-- 4f. Point-margin (Massey/SRS) ratings fit alongside each BT run
+CREATE TABLE IF NOT EXISTS bt.margin_ratings (
+    team_id INT NOT NULL,
+    rank INTEGER,
+    rating FLOAT,  -- points better than an average team on a neutral field
+    home_field FLOAT,  -- fitted home-field advantage in points (same for every row of a run)
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY(team_id, updated_at)
+);
+
+-- 4g. Latest BT / Colley / Massey / Keener ratings side by side
+CREATE TABLE IF NOT EXISTS bt.rating_ensemble (
+    team_id INT NOT NULL,
+    bt_strength FLOAT,
+    bt_rank INTEGER,
+    colley_rating FLOAT,
+    colley_rank INTEGER,
+    massey_rating FLOAT,
+    massey_rank INTEGER,
+    keener_rating FLOAT,
+    keener_rank INTEGER,
+    mean_rank FLOAT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY(team_id)
+);
+
+-- 4h. Opponent-adjusted team stats: expected value for (offense) and
+-- against (defense) each team versus an average opponent on a neutral field
+CREATE TABLE IF NOT EXISTS bt.team_stats_adjusted (
+    season INTEGER NOT NULL,
+    team_id INT NOT NULL,
+    games_played INTEGER,
+    adj_points_scored FLOAT,
+    adj_points_allowed FLOAT,
+    adj_total_yards FLOAT,
+    adj_yards_allowed FLOAT,
+    adj_third_eff FLOAT,
+    adj_third_eff_allowed FLOAT,
+    adj_fourth_eff FLOAT,
+    adj_fourth_eff_allowed FLOAT,
+    adj_yards_per_pass FLOAT,
+    adj_yards_per_pass_allowed FLOAT,
+    adj_yards_per_rush FLOAT,
+    adj_yards_per_rush_allowed FLOAT,
+    adj_turnovers FLOAT,
+    adj_turnovers_forced FLOAT,
+    adj_fumbles_lost FLOAT,
+    adj_fumbles_forced FLOAT,
+    adj_ints_thrown FLOAT,
+    adj_interceptions FLOAT,
+    adj_top FLOAT,
+    adj_top_allowed FLOAT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY(season, team_id)
+);
+
+-- 4i. Online Elo ratings (state for incremental per-game updates)
+CREATE TABLE IF NOT EXISTS bt.elo_ratings (
+    team_id INT NOT NULL,
+    rating DOUBLE,
+    games_played INTEGER,
+    last_season INTEGER,  -- season of the last applied game (new seasons regress to the mean)
+    last_game_date TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY(team_id)
+);
+
+-- One row per game applied to bt.elo_ratings (also the "already applied" marker)
+CREATE TABLE IF NOT EXISTS bt.elo_game_log (
+    game_id INT NOT NULL,
+    home_team_id INT,
+    away_team_id INT,
+    home_margin INTEGER,
+    home_rating_pre DOUBLE,
+    away_rating_pre DOUBLE,
+    home_win_prob DOUBLE,
+    rating_shift DOUBLE,  -- added to home, subtracted from away
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY(game_id)
+);
+
+-- 4j. Recency-decayed pair totals, rescaled in place between runs
+-- (weights, margins and game counts are as of bt.decay_state.as_of)
+CREATE TABLE IF NOT EXISTS bt.decayed_pair_totals (
+    half_life_days DOUBLE NOT NULL,
+    winner_id INT NOT NULL,
+    loser_id INT NOT NULL,
+    winner_home BOOLEAN NOT NULL,
+    weight DOUBLE,
+    margin DOUBLE,
+    games DOUBLE,
+    PRIMARY KEY(half_life_days, winner_id, loser_id, winner_home)
+);
+
+CREATE TABLE IF NOT EXISTS bt.decayed_pair_games (
+    half_life_days DOUBLE NOT NULL,
+    game_id INT NOT NULL,
+    PRIMARY KEY(half_life_days, game_id)
+);
+
+CREATE TABLE IF NOT EXISTS bt.decay_state (
+    half_life_days DOUBLE NOT NULL,
+    as_of TIMESTAMP,
+    PRIMARY KEY(half_life_days)
+);
+
+-- Rankings from decayed (?half_life_days=) runs, kept out of bt.rankings
+-- and bt.model_ranking_history, which hold the published undecayed model
+CREATE TABLE IF NOT EXISTS bt.decayed_rankings (
+    half_life_days DOUBLE NOT NULL,
+    team_id INT NOT NULL,
+    rank INT,
+    strength FLOAT NOT NULL,
+    prob_vs_avg FLOAT NOT NULL,
+    updated_at TIMESTAMP NOT NULL,  -- matches model_runs.updated_at
+    PRIMARY KEY(half_life_days, team_id, updated_at)
+);
+
+-- Margin (Massey/SRS) ratings from the same decayed runs (see 4f)
+CREATE TABLE IF NOT EXISTS bt.decayed_margin_ratings (
+    half_life_days DOUBLE NOT NULL,
+    team_id INT NOT NULL,
+    rank INTEGER,
+    rating FLOAT,
+    home_field FLOAT,
+    updated_at TIMESTAMP NOT NULL,  -- matches model_runs.updated_at
+    PRIMARY KEY(half_life_days, team_id, updated_at)
+);
+
+-- 4k. As-of weekly snapshots from backfill runs, kept out of the live history
+CREATE TABLE IF NOT EXISTS bt.ranking_backfill (
+    season INTEGER NOT NULL,
+    week INTEGER NOT NULL,
+    half_life_days DOUBLE NOT NULL DEFAULT 0,  -- 0 = no decay
+    team_id INT NOT NULL,
+    rank INT,
+    strength FLOAT NOT NULL,
+    prob_vs_avg FLOAT NOT NULL,
+    as_of TIMESTAMP,  -- last kickoff of the week
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY(season, week, half_life_days, team_id)
+);
+
+-- 4l. All-pairs matchup probabilities from the latest live BT run
+-- (one row per pair with team_a_id < team_b_id, replaced on each run)
+CREATE TABLE IF NOT EXISTS bt.matchup_probs (
+    team_a_id INT NOT NULL,
+    team_b_id INT NOT NULL,
+    prob_a_wins FLOAT NOT NULL,  -- P(team_a beats team_b), the reverse is 1 - prob_a_wins
+    updated_at TIMESTAMP,  -- matches model_ranking_history.updated_at
+    PRIMARY KEY(team_a_id, team_b_id)
+);
+
 -- 5. benchmarked team
 CREATE TABLE IF NOT EXISTS bt.benchmark_stats (
     model_run_timestamp TIMESTAMP NOT NULL PRIMARY KEY,
@@ -0,0 +1,275 @@
+"""
+Stage timings and peak memory for the BT ranking pipeline on synthetic seasons.
+
+Each size writes a synthetic season to a local DuckDB file (attached as
+"ncaa", so the Cloud Function's SQL runs unchanged) and runs the same steps
+as bradley_terry_rankings, preprocessing through the handler's own
+preprocess.py functions. Every stage records wall time and peak traced
+(Python + NumPy) memory, and each size reports the process max RSS. Times
+are the best of --repeat untraced runs; memory comes from one extra run
+under tracemalloc, which slows small stages down several-fold. Sizes
+run in a fresh process each, so one size's high-water mark does not leak
+into the next. Results go to a JSON file named after the current commit.
+With --compare, each stage is also shown against an earlier results file.
+
+    python benchmarks/bench_bt.py --sizes 130x800,700x6000,5000x1000000
+    python benchmarks/bench_bt.py --sizes 700x6000 --repeat 5 --compare benchmarks/results/abc1234.json
+
+Stages:
+    load           load_pair_totals: GAME_SUMMARY_SQL + PAIR_TOTALS_SQL in DuckDB
+                   (weights, min-games filter, pair totals)
+    weight         filter_pairs: team index and typed pair arrays
+    connectivity   largest connected component and index remap
+    solve          cold sparse ILSR fit
+    probabilities  ranking frame, all-pairs matchup matrix and pair rows
+    write          ranking history, current rankings and matchup pairs into DuckDB
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(BENCH_DIR.parent / "functions" / "bt_modeling"))
+
+from bt_solver import fit_bradley_terry  # noqa: E402
+from preprocess import filter_pairs, load_pair_totals  # noqa: E402
+from ranking import ALPHA, matchup_matrix, matchup_pairs, ranking_frame  # noqa: E402
+from synthetic import synthetic_season  # noqa: E402
+
+
+DEFAULT_SIZES = "130x800,700x6000,2000x50000,5000x1000000"
+RESULTS_DIR = BENCH_DIR / "results"
+
+# Only the columns the pipeline reads
+SCHEMA_SQL = """
+    CREATE SCHEMA IF NOT EXISTS ncaa.bt;
+    CREATE SCHEMA IF NOT EXISTS ncaa.real_deal;
+    CREATE TABLE ncaa.real_deal.dim_games (
+        id INT PRIMARY KEY, start_date TIMESTAMP, season INT, week INT
+    );
+    CREATE TABLE ncaa.bt.pairwise_comparisons (
+        game_id INT PRIMARY KEY, home_team_id INT NOT NULL, away_team_id INT NOT NULL,
+        home_won INT NOT NULL, score_margin INT
+    );
+    CREATE TABLE ncaa.bt.model_ranking_history (
+        team_id INT NOT NULL, rank INT, strength FLOAT NOT NULL, prob_vs_avg FLOAT NOT NULL,
+        updated_at TIMESTAMP, PRIMARY KEY (team_id, updated_at)
+    );
+"""
+
+
+class StageTimer:
+    """
+    Collects {stage: seconds} (best over runs) and, when tracing,
+    {stage: peak_mb} of traced memory allocated within the stage.
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self.peak_mb = {}
+        self.trace = False
+
+    def __call__(self, name, fn, *args):
+        if self.trace:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        out = fn(*args)
+        seconds = time.perf_counter() - start
+        if self.trace:
+            self.peak_mb[name] = round((tracemalloc.get_traced_memory()[1] - base) / 2**20, 2)
+        else:
+            self.seconds[name] = round(min(seconds, self.seconds.get(name, np.inf)), 5)
+        return out
+
+    @property
+    def stages(self):
+        return {name: {"seconds": seconds, "peak_mb": self.peak_mb.get(name)}
+                for name, seconds in self.seconds.items()}
+
+
+def build_database(path, games):
+    """Synthetic season into a fresh DuckDB file."""
+    con = duckdb.connect()
+    con.execute(f"ATTACH '{path}' AS ncaa")
+    con.execute(SCHEMA_SQL)
+    con.execute("""
+        INSERT INTO ncaa.real_deal.dim_games SELECT game_id, start_date, season, week FROM games
+    """)
+    con.execute("""
+        INSERT INTO ncaa.bt.pairwise_comparisons
+        SELECT game_id, home_team_id, away_team_id, home_won, score_margin FROM games
+    """)
+    con.close()
+
+
+def connected_set(pair_set):
+    team_mask, component_sizes = pair_set.component_mask()
+    return pair_set.restrict_teams(team_mask), len(component_sizes)
+
+
+def probabilities(team_ids, log_params):
+    ranking = ranking_frame(team_ids, log_params)
+    return ranking, matchup_pairs(team_ids, matchup_matrix(np.exp(log_params)))
+
+
+def write_results(con, ranking, matchup_df):
+    con.execute("""
+        INSERT INTO ncaa.bt.model_ranking_history (team_id, rank, strength, prob_vs_avg, updated_at)
+        SELECT team_id, rank, strength, prob_vs_avg, ? FROM ranking
+    """, [pd.Timestamp.now()])
+    con.execute("CREATE OR REPLACE TABLE ncaa.bt.rankings AS SELECT * FROM ranking")
+    con.execute("CREATE OR REPLACE TABLE ncaa.bt.matchup_probs AS SELECT * FROM matchup_df")
+
+
+def run_pipeline(con, timer):
+    """The bradley_terry_rankings steps, each timed as one stage."""
+    (total_games, total_teams, _), pairs = timer("load", load_pair_totals, con)
+    pair_set = timer("weight", filter_pairs, pairs)
+    final_set, n_components = timer("connectivity", connected_set, pair_set)
+    log_params, solver_info = timer("solve", fit_bradley_terry, final_set.win_matrix(), ALPHA)
+    ranking, matchup_df = timer("probabilities", probabilities, final_set.team_ids, log_params)
+    timer("write", write_results, con, ranking, matchup_df)
+    return {
+        "total_games": int(total_games),
+        "total_teams": int(total_teams),
+        "pairs": len(pairs),
+        "ranked_teams": final_set.n_teams,
+        "components": n_components,
+        "solver": solver_info["solver"],
+        "iterations": solver_info["iterations"],
+    }, final_set.team_ids, log_params
+
+
+def run_size(n_teams, n_games, seed, repeat):
+    """Build one synthetic database and time every pipeline stage on it."""
+    games, strengths = synthetic_season(n_teams, n_games, seed=seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.duckdb")
+        start = time.perf_counter()
+        build_database(path, games)
+        build_seconds = time.perf_counter() - start
+        del games
+
+        con = duckdb.connect()
+        con.execute(f"ATTACH '{path}' AS ncaa")
+        timer = StageTimer()
+        try:
+            for _ in range(repeat):
+                summary, team_ids, log_params = run_pipeline(con, timer)
+            timer.trace = True
+            tracemalloc.start()
+            try:
+                run_pipeline(con, timer)
+            finally:
+                tracemalloc.stop()
+            db_bytes = os.path.getsize(path)
+        finally:
+            con.close()
+
+    # Sanity check that the fit recovers the generator's ordering
+    truth = strengths.loc[team_ids].to_numpy()
+    rank_corr = float(np.corrcoef(np.argsort(np.argsort(truth)), np.argsort(np.argsort(log_params)))[0, 1])
+    return {
+        "n_teams": n_teams,
+        "n_games": n_games,
+        **summary,
+        "repeat": repeat,
+        "rank_correlation": round(rank_corr, 4),
+        "build_db_seconds": round(build_seconds, 3),
+        "db_mb": round(db_bytes / 2**20, 2),
+        "stages": timer.stages,
+        "total_seconds": round(sum(s["seconds"] for s in timer.stages.values()), 5),
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                            / (2**20 if sys.platform == "darwin" else 2**10), 1),
+    }
+
+
+def parse_sizes(value):
+    """'130x800,5000x1000000' -> [(130, 800), (5000, 1000000)]"""
+    return [tuple(int(x) for x in size.lower().split("x")) for size in value.split(",") if size.strip()]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_comparison(results, baseline):
+    """Per-stage time ratio (current / baseline) for sizes present in both runs."""
+    previous = {(r["n_teams"], r["n_games"]): r for r in baseline["results"]}
+    print(f"\nvs {baseline['commit']}:")
+    for result in results:
+        old = previous.get((result["n_teams"], result["n_games"]))
+        if old is None:
+            continue
+        ratios = [
+            f"{stage} {timing['seconds'] / old['stages'][stage]['seconds']:.2f}x"
+            for stage, timing in result["stages"].items()
+            if old["stages"].get(stage, {}).get("seconds")
+        ]
+        print(f"  {result['n_teams']}x{result['n_games']}: " + ", ".join(ratios))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated TEAMSxGAMES")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per size (best is kept)")
+    parser.add_argument("--out", default=None, help="JSON path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to compare stage times against")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = []
+    for n_teams, n_games in parse_sizes(args.sizes):
+        print(f"Benchmarking {n_teams} teams / {n_games} games...")
+        # Fresh process per size so max RSS and allocator state are per size
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            result = pool.submit(run_size, n_teams, n_games, args.seed, args.repeat).result()
+        results.append(result)
+        stages = ", ".join(f"{name} {s['seconds'] * 1000:.1f}ms" for name, s in result["stages"].items())
+        print(f"✓ {result['total_seconds']:.3f}s total, max RSS {result['max_rss_mb']} MB, "
+              f"{result['solver']} {result['iterations']} iterations, rank corr {result['rank_correlation']}")
+        print(f"  {stages}")
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{commit}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "duckdb": duckdb.__version__,
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }, indent=2))
+    print(f"✓ Wrote {out}")
+
+    if args.compare:
+        print_comparison(results, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    main()
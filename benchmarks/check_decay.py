@@ -0,0 +1,129 @@
+"""
+Regression check for the incremental decayed pair totals (decay.py).
+
+Builds a synthetic multi-season database from the real bt_schema.sql,
+updates the decayed totals at several as-of dates, rebuilds them from
+scratch at the last one and checks that both paths agree. The default
+half-lives include values that are not exact binary fractions (10.1), which
+must round-trip through the half_life_days key columns.
+
+    python benchmarks/check_decay.py
+    python benchmarks/check_decay.py --half-lives 10.1,30 --teams 300 --games 3000
+"""
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+SCHEMA_PATH = BENCH_DIR.parent / "airflow" / "include" / "sql" / "bt_schema.sql"
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(BENCH_DIR.parent / "functions" / "bt_modeling"))
+
+from comparisons import MAX_MARGIN_WEIGHT  # noqa: E402
+from decay import PRUNE_GAMES, update_decayed_pairs  # noqa: E402
+from synthetic import synthetic_season  # noqa: E402
+
+
+PAIR_KEY = ['winner_id', 'loser_id', 'winner_home']
+RTOL = 1e-12
+
+
+def build_database(path, n_teams, n_games, seasons):
+    """Synthetic seasons into a DuckDB file laid out by bt_schema.sql."""
+    frames, offset = [], 0
+    for season in seasons:
+        games, _ = synthetic_season(n_teams, n_games, season=season, seed=season)
+        games['game_id'] += offset
+        offset += len(games)
+        frames.append(games)
+    games = pd.concat(frames, ignore_index=True)
+
+    con = duckdb.connect(path)
+    con.execute("CREATE SCHEMA bt; CREATE SCHEMA real_deal;")
+    con.execute(SCHEMA_PATH.read_text())
+    con.execute("CREATE TABLE real_deal.dim_games AS SELECT game_id AS id, start_date, season, week FROM games")
+    con.execute("""
+        INSERT INTO bt.pairwise_comparisons (game_id, home_team_id, away_team_id, home_won, score_margin)
+        SELECT game_id, home_team_id, away_team_id, home_won, score_margin FROM games
+    """)
+    con.close()
+    return games['start_date']
+
+
+def check_column_types(con):
+    """Every half_life_days key column must hold the DOUBLE parameters exactly."""
+    types = con.execute("""
+        SELECT table_name, data_type
+        FROM information_schema.columns
+        WHERE table_catalog = 'ncaa' AND column_name = 'half_life_days'
+    """).fetchall()
+    wrong = [f"{table} ({data_type})" for table, data_type in types if data_type != 'DOUBLE']
+    assert types and not wrong, f"half_life_days is not DOUBLE in: {', '.join(wrong)}"
+    print(f"✓ half_life_days is DOUBLE in {len(types)} tables")
+
+
+def reset(con, half_life):
+    for table in ("decayed_pair_totals", "decayed_pair_games", "decay_state"):
+        con.execute(f"DELETE FROM ncaa.bt.{table} WHERE half_life_days = ?", [half_life])
+
+
+def check_half_life(con, half_life, as_of_dates):
+    """Incremental updates at as_of_dates vs a full rebuild at the last one."""
+    reset(con, half_life)
+    for as_of in as_of_dates:
+        incremental = update_decayed_pairs(con, half_life, as_of)
+        assert len(incremental), f"half-life {half_life}: no decayed pairs at {as_of}"
+    # A repeat at the same as-of merges nothing and must not hit the primary keys
+    incremental = update_decayed_pairs(con, half_life, as_of_dates[-1])
+
+    reset(con, half_life)
+    full = update_decayed_pairs(con, half_life, as_of_dates[-1])
+
+    merged = incremental.merge(full, on=PAIR_KEY, how='outer', suffixes=('_inc', '_full'), indicator=True)
+    mismatched = (merged['_merge'] != 'both').sum()
+    assert mismatched == 0, f"half-life {half_life}: {mismatched} pairs in only one of incremental/full"
+    # A pair pruned before it got a new game is short by up to PRUNE_GAMES
+    # decayed games (times the largest per-game weight or margin) in the
+    # incremental totals, and nothing else may differ
+    max_margin = con.execute("SELECT MAX(ABS(score_margin)) FROM ncaa.bt.pairwise_comparisons").fetchone()[0]
+    per_game = {'weight': MAX_MARGIN_WEIGHT, 'margin': max_margin, 'games': 1.0}
+    for col in ('weight', 'margin', 'games'):
+        allowed = RTOL * merged[f'{col}_full'].abs() + PRUNE_GAMES * per_game[col]
+        excess = (np.abs(merged[f'{col}_inc'] - merged[f'{col}_full']) - allowed).max()
+        assert excess <= 0, f"half-life {half_life}: {col} differs beyond the pruned mass by {excess:.2e}"
+    print(f"✓ half-life {half_life:g}d: {len(full)} pairs, incremental matches the full rebuild")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--half-lives", default="10.1,30", help="comma-separated half-lives in days")
+    parser.add_argument("--teams", type=int, default=300)
+    parser.add_argument("--games", type=int, default=3000, help="games per season")
+    parser.add_argument("--seasons", default="2023,2024,2025")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "decay.duckdb")
+        start_dates = build_database(path, args.teams, args.games, [int(s) for s in args.seasons.split(",")])
+        # Mid-season, off-season and end-of-data as-of times
+        as_of_dates = list(start_dates.quantile([0.2, 0.45, 0.7, 0.9]).dt.floor('D')) + [start_dates.max()]
+
+        con = duckdb.connect()
+        con.execute(f"ATTACH '{path}' AS ncaa")
+        try:
+            check_column_types(con)
+            for half_life in (float(h) for h in args.half_lives.split(",")):
+                check_half_life(con, half_life, as_of_dates)
+        finally:
+            con.close()
+    print("✅ Decay checks passed")
+
+
+if __name__ == "__main__":
+    main()
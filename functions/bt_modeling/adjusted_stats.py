@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+
+
+# fact_game_team column -> (offense name, defense name) in bt.team_stats_adjusted
+ADJUSTED_METRICS = {
+    'score': ('points_scored', 'points_allowed'),
+    'total_yards': ('total_yards', 'yards_allowed'),
+    'third_eff': ('third_eff', 'third_eff_allowed'),
+    'fourth_eff': ('fourth_eff', 'fourth_eff_allowed'),
+    'yards_per_pass': ('yards_per_pass', 'yards_per_pass_allowed'),
+    'yards_per_rush': ('yards_per_rush', 'yards_per_rush_allowed'),
+    'turnovers': ('turnovers', 'turnovers_forced'),
+    'fumbles_lost': ('fumbles_lost', 'fumbles_forced'),
+    'ints_thrown': ('ints_thrown', 'interceptions'),
+    'top': ('top', 'top_allowed'),
+}
+
+# Ridge penalty (in games) pulling each component toward 0; also pins down
+# the off/def constant that the games alone cannot identify
+ADJUST_RIDGE = 1.0
+
+# One row per team per game with the opponent on the same row
+TEAM_GAMES_SQL = f"""
+    SELECT
+        t.game_id,
+        t.team_id,
+        opp.team_id AS opponent_id,
+        t.home_away,
+        {', '.join(f't.{col}' for col in ADJUSTED_METRICS)}
+    FROM ncaa.real_deal.fact_game_team t
+    JOIN ncaa.real_deal.fact_game_team opp
+        ON t.game_id = opp.game_id
+        AND t.team_id != opp.team_id
+    JOIN ncaa.real_deal.dim_games g ON t.game_id = g.id
+    WHERE g.season = ?
+"""
+
+
+def adjust_team_stats(team_games: pd.DataFrame, ridge=ADJUST_RIDGE):
+    """
+    Opponent-adjusted offense and defense for every metric at once.
+
+    Each team-game row is modelled as
+        stat = mean + offense[team] + defense[opponent] + home_sign * home_field
+    and the ridge normal equations (X'X + ridge*I) b = X'Y are factorized
+    once with sparse LU and solved for all metric columns of Y together.
+    Missing stats are filled with the metric mean so they add no signal.
+    Returns one row per team with adj_<offense> and adj_<defense> columns:
+    the expected stat for / against the team versus an average opponent on
+    a neutral field.
+    """
+    team_ids, inverse = np.unique(
+        np.concatenate([team_games['team_id'].to_numpy(), team_games['opponent_id'].to_numpy()]),
+        return_inverse=True,
+    )
+    n_rows, n_teams = len(team_games), len(team_ids)
+    offense, defense = inverse[:n_rows], inverse[n_rows:]
+    home_sign = np.select(
+        [team_games['home_away'].str.lower() == 'home', team_games['home_away'].str.lower() == 'away'],
+        [1.0, -1.0],
+        0.0,
+    )
+
+    # Columns: offense 0..n-1, defense n..2n-1, home field 2n
+    rows = np.arange(n_rows)
+    design = sp.csr_matrix(
+        (
+            np.concatenate([np.ones(n_rows), np.ones(n_rows), home_sign]),
+            (np.tile(rows, 3), np.concatenate([offense, n_teams + defense, np.full(n_rows, 2 * n_teams)])),
+        ),
+        shape=(n_rows, 2 * n_teams + 1),
+    )
+
+    stats = team_games[list(ADJUSTED_METRICS)].astype(float)
+    means = stats.mean().fillna(0.0)
+    centered = (stats - means).fillna(0.0).to_numpy()
+
+    normal = (design.T @ design + ridge * sp.identity(design.shape[1])).tocsc()
+    # Symmetric ordering keeps the fill-in of the SPD normal matrix down
+    lu = splu(normal, permc_spec="MMD_AT_PLUS_A", options={"SymmetricMode": True})
+    solution = lu.solve(design.T @ centered)  # (2n+1) x n_metrics
+
+    adjusted = pd.DataFrame({
+        'team_id': team_ids.astype(np.int64),
+        'games_played': np.bincount(offense, minlength=n_teams),
+    })
+    for j, (col, (off_name, def_name)) in enumerate(ADJUSTED_METRICS.items()):
+        adjusted[f'adj_{off_name}'] = means[col] + solution[:n_teams, j]
+        adjusted[f'adj_{def_name}'] = means[col] + solution[n_teams:2 * n_teams, j]
+    home_field = dict(zip(ADJUSTED_METRICS, solution[2 * n_teams]))
+    return adjusted, home_field
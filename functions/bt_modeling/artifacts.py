@@ -0,0 +1,90 @@
+import hashlib
+import io
+import os
+from pathlib import Path
+
+import numpy as np
+
+from comparisons import MARGIN_WEIGHT_SCALE, MAX_MARGIN_WEIGHT, MIN_GAMES, GameSet
+
+
+# Bump when the artifact layout or the preprocessing changes
+ARTIFACT_VERSION = 1
+
+# /tmp survives between invocations on a warm Cloud Functions instance
+LOCAL_CACHE_DIR = Path(os.environ.get("BT_CACHE_DIR", "/tmp/bt_cache"))
+GCS_PREFIX = "bt/preprocessed"
+
+# Cheap fingerprint of pairwise_comparisons: newest game, row count and an
+# order-independent checksum over the columns the preprocessing reads
+DATA_VERSION_SQL = """
+    SELECT
+        MAX(game_id),
+        COUNT(*),
+        SUM(hash(game_id, home_team_id, away_team_id, home_won, score_margin)) % 18446744073709551616
+    FROM ncaa.bt.pairwise_comparisons
+"""
+
+
+def data_version(md):
+    """Cache key for the current data and preprocessing settings."""
+    max_game_id, n_rows, checksum = md.execute(DATA_VERSION_SQL).fetchone()
+    settings = hashlib.sha1(
+        f"{ARTIFACT_VERSION}|{MIN_GAMES}|{MARGIN_WEIGHT_SCALE}|{MAX_MARGIN_WEIGHT}".encode()
+    ).hexdigest()[:8]
+    return f"v{ARTIFACT_VERSION}-{max_game_id}-{n_rows}-{int(checksum or 0):016x}-{settings}"
+
+
+def _to_bytes(pair_set, team_mask, component_sizes, summary):
+    buffer = io.BytesIO()
+    pair_set.to_npz(
+        buffer,
+        team_mask=team_mask,
+        component_sizes=component_sizes,
+        summary=np.asarray(summary, dtype=float),
+    )
+    return buffer.getvalue()
+
+
+def _from_bytes(data):
+    with np.load(io.BytesIO(data)) as npz:
+        pair_set = GameSet.from_npz(npz)
+        total_games, total_teams, avg_weight = npz['summary']
+        summary = (int(total_games), int(total_teams), float(avg_weight))
+        return summary, pair_set, npz['team_mask'], npz['component_sizes']
+
+
+def fetch_artifact(key, bucket=None):
+    """
+    (summary, pair_set, team_mask, component_sizes) for key from local disk,
+    then GCS (copied to local disk on a hit), or None on a miss.
+    """
+    local = LOCAL_CACHE_DIR / f"{key}.npz"
+    if local.exists():
+        print(f"✓ Preprocessed artifact {key} from local cache")
+        return _from_bytes(local.read_bytes())
+
+    if bucket is not None:
+        blob = bucket.blob(f"{GCS_PREFIX}/{key}.npz")
+        if blob.exists():
+            data = blob.download_as_bytes()
+            _write_local(local, data)
+            print(f"✓ Preprocessed artifact {key} from gs://{bucket.name}/{GCS_PREFIX}")
+            return _from_bytes(data)
+    return None
+
+
+def store_artifact(key, artifact, bucket=None):
+    """Write the artifact to local disk and, when a bucket is given, to GCS."""
+    data = _to_bytes(*artifact[1:], artifact[0])
+    _write_local(LOCAL_CACHE_DIR / f"{key}.npz", data)
+    if bucket is not None:
+        bucket.blob(f"{GCS_PREFIX}/{key}.npz").upload_from_string(data, content_type="application/octet-stream")
+    print(f"✓ Stored preprocessed artifact {key} ({len(data) / 1024:.1f} KiB)")
+
+
+def _write_local(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
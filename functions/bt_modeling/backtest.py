@@ -0,0 +1,254 @@
+"""
+Rolling-origin backtest of the BT, Elo and margin (Massey) engines.
+
+For every week of the selected seasons, each engine is fit on all loaded
+games that kicked off before the week's first game and scored on that
+week's games (log loss, Brier score, accuracy for the home team winning).
+Weeks run in a process pool, and every fit is cached on disk keyed by the
+engine settings and a fingerprint of its training games, so re-running
+with one changed setting only refits the engine that setting belongs to.
+
+    python backtest.py --seasons 2024,2025 --alpha 0.01 --elo-k 25 --out backtest.csv
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+
+from comparisons import MIN_GAMES, GameSet
+from elo import ELO_BASE, HOME_FIELD, K_FACTOR, SEASON_CARRYOVER, EloEngine, expected_home
+from engine import rank_game_set
+from massey import fit_margin_ratings
+from ranking import ALPHA
+from sweep import parse_grid
+
+
+ENGINES = ("bt", "elo", "margin")
+
+GAMES_SQL = """
+    SELECT
+        pc.game_id,
+        g.season,
+        g.week,
+        g.start_date,
+        pc.home_team_id,
+        pc.away_team_id,
+        pc.home_won,
+        pc.score_margin,
+        pc.score_margin AS home_margin
+    FROM ncaa.bt.pairwise_comparisons pc
+    JOIN ncaa.real_deal.dim_games g ON pc.game_id = g.id
+    WHERE list_contains(?, g.season)
+      AND pc.score_margin <> 0
+    ORDER BY g.start_date, pc.game_id
+"""
+
+# Part of every cache key; bump when a fitter changes so old fits are not reused
+CACHE_VERSION = 1
+
+# Probabilities are clipped before the log so one confident miss stays finite
+EPS = 1e-6
+
+# Set in each worker by _attach_games()
+_games = {}
+
+
+def _attach_games(games, cache_dir):
+    """Pool initializer: games frame and GameSet shared by every week in this worker."""
+    _games["frame"] = games
+    _games["set"] = GameSet.from_games(games)
+    _games["cache_dir"] = Path(cache_dir)
+
+
+def _fingerprint(config, train_rows):
+    """Cache key: engine settings plus the exact training games."""
+    digest = hashlib.sha1(json.dumps([CACHE_VERSION, config], sort_keys=True).encode())
+    digest.update(_games["frame"]['game_id'].to_numpy()[:train_rows].tobytes())
+    digest.update(_games["frame"]['home_margin'].to_numpy()[:train_rows].tobytes())
+    return digest.hexdigest()
+
+
+def cached_fit(engine, config, train_rows):
+    """
+    Fitted parameters for one engine on the first train_rows games, from the
+    disk cache when the same settings and training games were seen before.
+    Returns (team_ids, ratings, extra dict, cache_hit).
+    """
+    path = _games["cache_dir"] / engine / f"{_fingerprint(config, train_rows)}.npz"
+    if path.exists():
+        with np.load(path) as data:
+            return data['team_ids'], data['ratings'], json.loads(str(data['extra'])), True
+
+    team_ids, ratings, extra = FITTERS[engine](config, train_rows)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp.npz")
+    np.savez(tmp, team_ids=team_ids, ratings=ratings, extra=json.dumps(extra))
+    os.replace(tmp, path)  # atomic, so parallel workers never read half a file
+    return team_ids, ratings, extra, False
+
+
+def fit_bt(config, train_rows):
+    train = _games["set"].subset(slice(0, train_rows))
+    result = rank_game_set(train, alpha=config["alpha"], min_games=config["min_games"])
+    if result is None:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), {}
+    return result.team_ids, result.log_params, {}
+
+
+def fit_elo(config, train_rows):
+    engine = EloEngine(k=config["k"], home_field=config["home_field"], carryover=config["carryover"])
+    engine.apply_games(_games["frame"].iloc[:train_rows])
+    ratings = engine.ratings_frame().sort_values('team_id')
+    return ratings['team_id'].to_numpy(dtype=np.int64), ratings['rating'].to_numpy(dtype=float), {}
+
+
+def fit_margin(config, train_rows):
+    train = _games["set"].subset(slice(0, train_rows))
+    ratings, home_field, _ = fit_margin_ratings(train)
+    # Spread of single-game margins around the fit turns a predicted margin into a
+    # win probability; dividing by the residual degrees of freedom keeps early-season
+    # fits (few games per team) from being overconfident
+    predicted = ratings[train.winners] - ratings[train.losers] + train.home_sign * home_field
+    dof = max(len(train) - train.n_teams - 1, 1)
+    sigma = float(np.sqrt(np.sum((train.margins - predicted) ** 2) / dof))
+    return train.team_ids, ratings, {"home_field": float(home_field), "sigma": sigma}
+
+
+FITTERS = {"bt": fit_bt, "elo": fit_elo, "margin": fit_margin}
+
+
+def predict_home(engine, team_ids, ratings, extra, config, home_ids, away_ids):
+    """P(home team wins) for each test game; teams without a rating are average."""
+    default = ELO_BASE if engine == "elo" else 0.0
+    home = _lookup(team_ids, ratings, home_ids, default)
+    away = _lookup(team_ids, ratings, away_ids, default)
+    if engine == "elo":
+        return expected_home(home, away, config["home_field"])
+    if engine == "bt":
+        return 1 / (1 + np.exp(away - home))
+    return ndtr((home - away + extra["home_field"]) / max(extra["sigma"], EPS))
+
+
+def _lookup(team_ids, ratings, ids, default):
+    """ratings for ids (team_ids sorted), default where a team is missing."""
+    out = np.full(len(ids), default, dtype=float)
+    if len(team_ids) == 0:
+        return out
+    pos = np.minimum(np.searchsorted(team_ids, ids), len(team_ids) - 1)
+    found = team_ids[pos] == ids
+    out[found] = ratings[pos[found]]
+    return out
+
+
+def score(p_home, home_won):
+    p = np.clip(p_home, EPS, 1 - EPS)
+    return {
+        "log_loss": float(-np.mean(home_won * np.log(p) + (1 - home_won) * np.log(1 - p))),
+        "brier": float(np.mean((p_home - home_won) ** 2)),
+        "accuracy": float(np.mean((p_home > 0.5) == (home_won == 1))),
+    }
+
+
+def evaluate_week(job):
+    """Fit every engine on the games before one week and score that week."""
+    season, week, train_rows, test_rows, configs = job
+    games = _games["frame"]
+    test = games.iloc[test_rows]
+    home_ids = test['home_team_id'].to_numpy(dtype=np.int64)
+    away_ids = test['away_team_id'].to_numpy(dtype=np.int64)
+    home_won = test['home_won'].to_numpy(dtype=float)
+
+    rows = []
+    for engine, config in configs.items():
+        start = time.perf_counter()
+        team_ids, ratings, extra, hit = cached_fit(engine, config, train_rows)
+        p_home = predict_home(engine, team_ids, ratings, extra, config, home_ids, away_ids)
+        rows.append({
+            "season": season,
+            "week": week,
+            "engine": engine,
+            "train_games": train_rows,
+            "test_games": len(test),
+            **score(p_home, home_won),
+            "cache_hit": hit,
+            "seconds": round(time.perf_counter() - start, 4),
+        })
+    return rows
+
+
+def week_jobs(games, configs, min_train_games):
+    """(season, week, train_rows, test_rows, configs) for every scoreable week."""
+    jobs = []
+    start_dates = games['start_date'].to_numpy()
+    for (season, week), rows in games.groupby(['season', 'week'], sort=False).indices.items():
+        # Train on everything that kicked off before the week's first game
+        train_rows = int(np.searchsorted(start_dates, start_dates[rows].min(), side='left'))
+        if train_rows < min_train_games:
+            continue
+        jobs.append((int(season), int(week), train_rows, rows, configs))
+    return sorted(jobs, key=lambda job: (job[0], job[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default=None,
+                        help="DuckDB path or md: URL (default: MotherDuck via MOTHERDUCK_TOKEN)")
+    parser.add_argument("--seasons", required=True, help="comma-separated seasons to load and score")
+    parser.add_argument("--engines", default=",".join(ENGINES))
+    parser.add_argument("--alpha", type=float, default=ALPHA)
+    parser.add_argument("--min-games", type=float, default=MIN_GAMES)
+    parser.add_argument("--elo-k", type=float, default=K_FACTOR)
+    parser.add_argument("--elo-home-field", type=float, default=HOME_FIELD)
+    parser.add_argument("--elo-carryover", type=float, default=SEASON_CARRYOVER)
+    parser.add_argument("--min-train-games", type=int, default=200,
+                        help="skip weeks with fewer earlier games than this")
+    parser.add_argument("--cache-dir", default=".backtest_cache")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default="backtest_results.csv")
+    args = parser.parse_args()
+
+    all_configs = {
+        "bt": {"alpha": args.alpha, "min_games": args.min_games},
+        "elo": {"k": args.elo_k, "home_field": args.elo_home_field, "carryover": args.elo_carryover},
+        "margin": {},
+    }
+    configs = {engine: all_configs[engine] for engine in args.engines.split(",") if engine.strip()}
+
+    database = args.database or f"md:?motherduck_token={os.environ['MOTHERDUCK_TOKEN']}"
+    con = duckdb.connect(database)
+    games = con.execute(GAMES_SQL, [parse_grid(args.seasons, int)]).df()
+    con.close()
+    print(f"✓ Loaded {len(games)} games for seasons {args.seasons}")
+
+    jobs = week_jobs(games, configs, args.min_train_games)
+    print(f"Backtesting {len(jobs)} weeks x {len(configs)} engines on {args.workers} workers...")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=args.workers, initializer=_attach_games, initargs=(games, args.cache_dir)
+    ) as pool:
+        results = pd.DataFrame([row for rows in pool.map(evaluate_week, jobs) for row in rows])
+
+    results.to_csv(args.out, index=False)
+    hits = int(results['cache_hit'].sum())
+    print(f"✓ Scored {len(jobs)} weeks in {time.perf_counter() - start:.1f}s "
+          f"({hits}/{len(results)} fits from cache) -> {args.out}")
+
+    # Game-weighted averages over all scored weeks
+    weighted = results[['log_loss', 'brier', 'accuracy']].mul(results['test_games'], axis=0)
+    summary = weighted.groupby(results['engine']).sum().div(
+        results.groupby('engine')['test_games'].sum(), axis=0
+    )
+    print(summary.round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
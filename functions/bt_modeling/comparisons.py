@@ -0,0 +1,351 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+from bt_solver import sparse_win_matrix
+
+
+# Weight function: log scale with cap at 3x
+# This means: 7pt win ≈ 1.7x, 14pt ≈ 1.9x, 21pt ≈ 2x, 35pt ≈ 2.2x (never above 3x)
+MARGIN_WEIGHT_SCALE = 3.0
+MAX_MARGIN_WEIGHT = 3.0
+
+# Teams need ~4 games (measured in average-weight games) to be ranked
+MIN_GAMES = 4
+
+# Same weighting as margin_weights(), evaluated inside DuckDB
+WEIGHT_SQL = f"LEAST(1 + LN(1 + ABS(COALESCE(score_margin, 0))) / {MARGIN_WEIGHT_SCALE}, {MAX_MARGIN_WEIGHT})"
+WINNER_SQL = "CASE WHEN home_won = 1 THEN home_team_id ELSE away_team_id END"
+LOSER_SQL = "CASE WHEN home_won = 1 THEN away_team_id ELSE home_team_id END"
+
+GAME_WEIGHTS_CTE = f"""
+    games AS (
+        SELECT
+            {WINNER_SQL} AS winner_id,
+            {LOSER_SQL} AS loser_id,
+            home_won = 1 AS winner_home,
+            ABS(COALESCE(score_margin, 0)) AS margin,
+            {WEIGHT_SQL} AS weight
+        FROM ncaa.bt.pairwise_comparisons
+    )
+"""
+
+# One row per ordered (winner_id, loser_id) and winner venue between teams
+# meeting the min-games threshold (weighted games >= MIN_GAMES * average weight).
+# BT sums the venues back together; the margin model uses them for home field.
+PAIR_TOTALS_SQL = f"""
+    WITH {GAME_WEIGHTS_CTE},
+    team_games AS (
+        SELECT team_id, SUM(weight) AS weighted_games
+        FROM (
+            SELECT winner_id AS team_id, weight FROM games
+            UNION ALL
+            SELECT loser_id AS team_id, weight FROM games
+        )
+        GROUP BY team_id
+    ),
+    eligible AS (
+        SELECT team_id
+        FROM team_games
+        WHERE weighted_games >= {MIN_GAMES} * (SELECT AVG(weight) FROM games)
+    )
+    SELECT
+        g.winner_id,
+        g.loser_id,
+        g.winner_home,
+        SUM(g.weight) AS weight,
+        SUM(g.margin) AS margin,
+        COUNT(*) AS games
+    FROM games g
+    JOIN eligible w ON g.winner_id = w.team_id
+    JOIN eligible l ON g.loser_id = l.team_id
+    GROUP BY g.winner_id, g.loser_id, g.winner_home
+"""
+
+# PAIR_TOTALS_SQL computed separately for each season in a list parameter
+SEASON_PAIR_TOTALS_SQL = f"""
+    WITH games AS (
+        SELECT
+            g.season,
+            {WINNER_SQL} AS winner_id,
+            {LOSER_SQL} AS loser_id,
+            home_won = 1 AS winner_home,
+            ABS(COALESCE(score_margin, 0)) AS margin,
+            {WEIGHT_SQL} AS weight
+        FROM ncaa.bt.pairwise_comparisons pc
+        JOIN ncaa.real_deal.dim_games g ON pc.game_id = g.id
+        WHERE list_contains(?, g.season)
+    ),
+    team_games AS (
+        SELECT season, team_id, SUM(weight) AS weighted_games
+        FROM (
+            SELECT season, winner_id AS team_id, weight FROM games
+            UNION ALL
+            SELECT season, loser_id AS team_id, weight FROM games
+        )
+        GROUP BY season, team_id
+    ),
+    season_weight AS (
+        SELECT season, AVG(weight) AS avg_weight
+        FROM games
+        GROUP BY season
+    ),
+    eligible AS (
+        SELECT t.season, t.team_id
+        FROM team_games t
+        JOIN season_weight s ON t.season = s.season
+        WHERE t.weighted_games >= {MIN_GAMES} * s.avg_weight
+    )
+    SELECT
+        g.season,
+        g.winner_id,
+        g.loser_id,
+        g.winner_home,
+        SUM(g.weight) AS weight,
+        SUM(g.margin) AS margin,
+        COUNT(*) AS games
+    FROM games g
+    JOIN eligible w ON g.season = w.season AND g.winner_id = w.team_id
+    JOIN eligible l ON g.season = l.season AND g.loser_id = l.team_id
+    GROUP BY g.season, g.winner_id, g.loser_id, g.winner_home
+    ORDER BY g.season
+"""
+
+# Totals over all games, before any filtering
+GAME_SUMMARY_SQL = f"""
+    WITH {GAME_WEIGHTS_CTE}
+    SELECT
+        COUNT(*) AS total_games,
+        (SELECT COUNT(DISTINCT team_id) FROM (
+            SELECT winner_id AS team_id FROM games
+            UNION
+            SELECT loser_id AS team_id FROM games
+        )) AS total_teams,
+        AVG(weight) AS avg_weight
+    FROM games
+"""
+
+
+def margin_weights(score_margin, scale=MARGIN_WEIGHT_SCALE, cap=MAX_MARGIN_WEIGHT):
+    """
+    Margin-of-victory weight for each game: 1 + log1p(|margin|) / scale,
+    capped at cap. Missing or zero margins get the default weight of 1.0.
+    """
+    margin = np.abs(np.nan_to_num(np.asarray(score_margin, dtype=float), nan=0.0))
+    return np.minimum(1 + np.log1p(margin) / scale, cap)
+
+
+def weighted_game_counts(n_teams, winners, losers, weights):
+    """Total comparison weight each team has been part of."""
+    return (
+        np.bincount(winners, weights=weights, minlength=n_teams)
+        + np.bincount(losers, weights=weights, minlength=n_teams)
+    )
+
+
+def largest_component_mask(n_teams, winners, losers):
+    """
+    Boolean mask of the teams in the largest connected component.
+    Returns (mask, component_sizes) with sizes sorted largest first.
+    """
+    if n_teams == 0:
+        return np.zeros(0, dtype=bool), np.array([], dtype=int)
+
+    # Unique undirected edges are enough for connectivity
+    edges = np.unique(np.column_stack([winners, losers]), axis=0)
+    graph = sp.coo_matrix(
+        (np.ones(len(edges), dtype=np.int8), (edges[:, 0], edges[:, 1])),
+        shape=(n_teams, n_teams),
+    )
+    _, labels = connected_components(graph, directed=False)
+
+    # Only count teams that actually have an edge (others are singletons)
+    has_edge = np.zeros(n_teams, dtype=bool)
+    has_edge[edges.ravel()] = True
+    component_sizes = np.bincount(labels[has_edge], minlength=labels.max() + 1)
+    if component_sizes.sum() == 0:
+        return np.zeros(n_teams, dtype=bool), np.array([], dtype=int)
+
+    mask = has_edge & (labels == component_sizes.argmax())
+    return mask, np.sort(component_sizes[component_sizes > 0])[::-1]
+
+
+def eligible_team_mask(n_teams, winners, losers, weights, min_games):
+    """
+    Boolean team mask: at least min_games weighted games AND inside the
+    largest connected component of games between such teams.
+    Returns (mask, component_sizes) with sizes sorted largest first.
+    """
+    enough_games = weighted_game_counts(n_teams, winners, losers, weights) >= min_games
+    keep = enough_games[winners] & enough_games[losers]
+    return largest_component_mask(n_teams, winners[keep], losers[keep])
+
+
+def _index_dtype(n_teams):
+    """Smallest signed int type that can index n_teams."""
+    return np.int16 if n_teams <= np.iinfo(np.int16).max else np.int32
+
+
+@dataclass
+class GameSet:
+    """
+    Compact comparison set backed by typed arrays.
+
+    Each row is one game (or one aggregated (winner, loser, venue) group):
+    winners/losers index into the sorted team_ids array, weights are the
+    margin-of-victory weights, games is how many games the row stands for,
+    margins is the winner's total point margin over those games and
+    home_sign is +1 when the winner was at home, -1 when away, 0 if unknown.
+    """
+    team_ids: np.ndarray
+    winners: np.ndarray
+    losers: np.ndarray
+    weights: np.ndarray
+    games: np.ndarray = None
+    margins: np.ndarray = None
+    home_sign: np.ndarray = None
+
+    # Per-row arrays, in the order the constructor takes them
+    ROW_FIELDS = ('winners', 'losers', 'weights', 'games', 'margins', 'home_sign')
+
+    def __post_init__(self):
+        self.team_ids = np.ascontiguousarray(self.team_ids, dtype=np.int64)
+        idx_dtype = _index_dtype(len(self.team_ids))
+        self.winners = np.ascontiguousarray(self.winners, dtype=idx_dtype)
+        self.losers = np.ascontiguousarray(self.losers, dtype=idx_dtype)
+        self.weights = np.ascontiguousarray(self.weights, dtype=np.float32)
+        n_rows = len(self.winners)
+        self.games = np.ascontiguousarray(
+            np.ones(n_rows) if self.games is None else self.games, dtype=np.float32
+        )
+        self.margins = np.ascontiguousarray(
+            np.zeros(n_rows) if self.margins is None else self.margins, dtype=np.float32
+        )
+        self.home_sign = np.ascontiguousarray(
+            np.zeros(n_rows) if self.home_sign is None else self.home_sign, dtype=np.int8
+        )
+
+    def _rows(self, rows):
+        return [getattr(self, name)[rows] for name in self.ROW_FIELDS]
+
+    # ----- construction -----
+
+    @classmethod
+    def from_ids(cls, winner_ids, loser_ids, weights, games=None, margins=None, home_sign=None):
+        """Build the team index with one np.unique over both columns."""
+        winner_ids = np.asarray(winner_ids)
+        team_ids, inverse = np.unique(
+            np.concatenate([winner_ids, np.asarray(loser_ids)]), return_inverse=True
+        )
+        return cls(team_ids, inverse[:len(winner_ids)], inverse[len(winner_ids):],
+                   weights, games, margins, home_sign)
+
+    @classmethod
+    def from_games(cls, df: pd.DataFrame):
+        """One row per pairwise_comparisons game, weighted by margin."""
+        home_won = df['home_won'].to_numpy() == 1
+        home, away = df['home_team_id'].to_numpy(), df['away_team_id'].to_numpy()
+        score_margin = df['score_margin'].to_numpy(dtype=float, na_value=np.nan)
+        return cls.from_ids(
+            np.where(home_won, home, away),
+            np.where(home_won, away, home),
+            margin_weights(score_margin),
+            margins=np.abs(np.nan_to_num(score_margin)),
+            home_sign=np.where(home_won, 1, -1),
+        )
+
+    @classmethod
+    def from_pairs(cls, pairs: pd.DataFrame):
+        """One row per PAIR_TOTALS_SQL (winner_id, loser_id, winner_home) group."""
+        return cls.from_ids(
+            pairs['winner_id'].to_numpy(),
+            pairs['loser_id'].to_numpy(),
+            pairs['weight'].to_numpy(dtype=float),
+            pairs['games'].to_numpy(dtype=float),
+            pairs['margin'].to_numpy(dtype=float),
+            np.where(pairs['winner_home'].to_numpy(dtype=bool), 1, -1),
+        )
+
+    # ----- size -----
+
+    @property
+    def n_teams(self):
+        return len(self.team_ids)
+
+    def __len__(self):
+        return len(self.winners)
+
+    @property
+    def nbytes(self):
+        return self.team_ids.nbytes + sum(getattr(self, name).nbytes for name in self.ROW_FIELDS)
+
+    # ----- masking / subsetting -----
+
+    def subset(self, rows):
+        """Keep the selected rows (bool mask, slice or indices); team index unchanged."""
+        return GameSet(self.team_ids, *self._rows(rows))
+
+    def scaled(self, factors):
+        """Per-row rescale of weights, game counts and margins (e.g. recency decay)."""
+        factors = np.asarray(factors, dtype=np.float32)
+        return GameSet(
+            self.team_ids, self.winners, self.losers,
+            self.weights * factors, self.games * factors, self.margins * factors, self.home_sign,
+        )
+
+    def restrict_teams(self, team_mask):
+        """
+        Keep rows between masked teams and renumber those teams 0..k-1
+        in their original (sorted) order.
+        """
+        new_idx = np.cumsum(team_mask, dtype=np.int64) - 1
+        keep = team_mask[self.winners] & team_mask[self.losers]
+        winners, losers, *values = self._rows(keep)
+        return GameSet(self.team_ids[team_mask], new_idx[winners], new_idx[losers], *values)
+
+    # ----- graph checks -----
+
+    def weighted_game_counts(self):
+        return weighted_game_counts(self.n_teams, self.winners, self.losers, self.weights)
+
+    def component_mask(self):
+        """(mask, component_sizes) for the largest connected component."""
+        return largest_component_mask(self.n_teams, self.winners, self.losers)
+
+    def eligible_mask(self, min_games):
+        """(mask, component_sizes): min-games filter, then largest component."""
+        return eligible_team_mask(self.n_teams, self.winners, self.losers, self.weights, min_games)
+
+    def record_flags(self):
+        """(only_wins, only_losses) boolean masks over teams."""
+        has_wins = np.bincount(self.winners, minlength=self.n_teams) > 0
+        has_losses = np.bincount(self.losers, minlength=self.n_teams) > 0
+        return has_wins & ~has_losses, has_losses & ~has_wins
+
+    def win_matrix(self, weights=None):
+        """Sparse CSR W[i, j] = total weight of i's wins over j."""
+        return sparse_win_matrix(
+            self.n_teams, self.winners, self.losers, self.weights if weights is None else weights
+        )
+
+    # ----- serialization -----
+
+    def to_npz(self, file, **extra):
+        """Save to a path or file object; extra arrays are stored alongside."""
+        np.savez_compressed(
+            file,
+            team_ids=self.team_ids,
+            **{name: getattr(self, name) for name in self.ROW_FIELDS},
+            **extra,
+        )
+
+    @classmethod
+    def from_npz(cls, file):
+        """Load from a path, file object or an already open NpzFile."""
+        if isinstance(file, np.lib.npyio.NpzFile):
+            return cls(file['team_ids'], *(file[name] for name in cls.ROW_FIELDS))
+        with np.load(file) as data:
+            return cls.from_npz(data)
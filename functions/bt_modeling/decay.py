@@ -0,0 +1,122 @@
+"""
+Exponential recency decay for game weights.
+
+A game played d days before the as-of time counts 0.5 ** (d / half_life_days).
+Between two runs every stored game decays by the same factor, so the decayed
+pair totals in ncaa.bt.decayed_pair_totals are rescaled in place and only the
+games added since the last run are aggregated and merged in.
+"""
+import numpy as np
+import pandas as pd
+
+from comparisons import LOSER_SQL, WEIGHT_SQL, WINNER_SQL
+
+
+SECONDS_PER_DAY = 86400.0
+
+# Decayed rows below this many games are dropped so the state stays bounded
+PRUNE_GAMES = 1e-6
+
+# Completed games not yet merged into the decayed totals for this half-life
+NEW_DECAYED_PAIRS_SQL = f"""
+    WITH games AS (
+        SELECT
+            pc.game_id,
+            {WINNER_SQL} AS winner_id,
+            {LOSER_SQL} AS loser_id,
+            home_won = 1 AS winner_home,
+            ABS(COALESCE(score_margin, 0)) AS margin,
+            {WEIGHT_SQL} AS weight,
+            POW(0.5, date_diff('second', g.start_date, $as_of) / {SECONDS_PER_DAY} / $half_life) AS decay
+        FROM ncaa.bt.pairwise_comparisons pc
+        JOIN ncaa.real_deal.dim_games g ON pc.game_id = g.id
+        LEFT JOIN ncaa.bt.decayed_pair_games done
+            ON done.game_id = pc.game_id AND done.half_life_days = $half_life
+        WHERE done.game_id IS NULL
+          AND g.start_date <= $as_of
+    )
+"""
+
+
+def decay_factors(start_dates, as_of, half_life_days):
+    """Vectorized 0.5 ** (age_days / half_life_days); future games count fully."""
+    age = (pd.Timestamp(as_of) - pd.to_datetime(start_dates)) / pd.Timedelta(days=1)
+    return 0.5 ** (np.clip(np.asarray(age, dtype=float), 0, None) / half_life_days)
+
+
+def update_decayed_pairs(md, half_life_days, as_of):
+    """
+    Bring the decayed (winner, loser, venue) totals for one half-life up to
+    as_of and return them in PAIR_TOTALS_SQL's columns (no min-games filter).
+
+    First run: aggregate every game. Later runs: multiply the stored totals
+    by 0.5 ** (elapsed_days / half_life_days), then merge in only the new
+    games. Either way, pairs left with fewer than PRUNE_GAMES decayed games
+    are dropped. Runs in one transaction.
+    """
+    params = {"half_life": float(half_life_days), "as_of": pd.Timestamp(as_of)}
+    md.execute("BEGIN TRANSACTION")
+    try:
+        prev = md.execute(
+            "SELECT as_of FROM ncaa.bt.decay_state WHERE half_life_days = $half_life",
+            {"half_life": params["half_life"]},
+        ).fetchone()
+        if prev is not None:
+            # Uniform rescale of everything already aggregated
+            md.execute(f"""
+                UPDATE ncaa.bt.decayed_pair_totals
+                SET
+                    weight = weight * f.factor,
+                    margin = margin * f.factor,
+                    games = games * f.factor
+                FROM (
+                    SELECT POW(0.5, date_diff('second', CAST($prev AS TIMESTAMP), $as_of)
+                                    / {SECONDS_PER_DAY} / $half_life) AS factor
+                ) f
+                WHERE half_life_days = $half_life
+            """, {**params, "prev": prev[0]})
+
+        md.execute(f"""
+            INSERT INTO ncaa.bt.decayed_pair_totals
+                (half_life_days, winner_id, loser_id, winner_home, weight, margin, games)
+            {NEW_DECAYED_PAIRS_SQL}
+            SELECT
+                $half_life, winner_id, loser_id, winner_home,
+                SUM(weight * decay), SUM(margin * decay), SUM(decay)
+            FROM games
+            GROUP BY winner_id, loser_id, winner_home
+            ON CONFLICT (half_life_days, winner_id, loser_id, winner_home) DO UPDATE SET
+                weight = weight + EXCLUDED.weight,
+                margin = margin + EXCLUDED.margin,
+                games = games + EXCLUDED.games
+        """, params)
+        # After the merge, so a full rebuild drops exactly the pairs an
+        # incremental update would have
+        md.execute(
+            "DELETE FROM ncaa.bt.decayed_pair_totals WHERE half_life_days = $half_life AND games < $prune",
+            {"half_life": params["half_life"], "prune": PRUNE_GAMES},
+        )
+        new_games = md.execute(f"""
+            INSERT INTO ncaa.bt.decayed_pair_games (half_life_days, game_id)
+            {NEW_DECAYED_PAIRS_SQL}
+            SELECT $half_life, game_id FROM games
+        """, params).fetchone()[0]
+        md.execute(
+            "INSERT OR REPLACE INTO ncaa.bt.decay_state (half_life_days, as_of) VALUES ($half_life, $as_of)",
+            params,
+        )
+
+        pairs = md.execute("""
+            SELECT winner_id, loser_id, winner_home, weight, margin, games
+            FROM ncaa.bt.decayed_pair_totals
+            WHERE half_life_days = $half_life
+        """, {"half_life": params["half_life"]}).df()
+        md.execute("COMMIT")
+    except Exception:
+        md.execute("ROLLBACK")
+        raise
+
+    mode = "incremental" if prev is not None else "full"
+    print(f"✓ Decayed pair totals ({mode}, half-life {half_life_days}d): "
+          f"{new_games} new games merged, {len(pairs)} pairs")
+    return pairs
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+
+# Standard FBS-style Elo settings; ratings are on the usual 1500-centered scale
+ELO_BASE = 1500.0
+K_FACTOR = 25.0
+HOME_FIELD = 55.0
+# Share of last season's distance from the mean a team keeps into its first game of a new season
+SEASON_CARRYOVER = 2 / 3
+
+# Games are applied once both teams are in fact_game_team with different scores,
+# kickoff was at least this long ago (in-progress games are ingested with partial scores)
+FINAL_AFTER_HOURS = 5
+
+# Completed games not yet in the Elo log, oldest first
+NEW_GAMES_SQL = f"""
+    SELECT
+        g.id AS game_id,
+        g.season,
+        g.start_date,
+        h.team_id AS home_team_id,
+        a.team_id AS away_team_id,
+        h.score - a.score AS home_margin
+    FROM ncaa.real_deal.dim_games g
+    JOIN ncaa.real_deal.fact_game_team h ON h.game_id = g.id AND h.home_away = 'home'
+    JOIN ncaa.real_deal.fact_game_team a ON a.game_id = g.id AND a.home_away = 'away'
+    LEFT JOIN ncaa.bt.elo_game_log lg ON lg.game_id = g.id
+    WHERE lg.game_id IS NULL
+      AND h.score IS NOT NULL AND a.score IS NOT NULL
+      AND h.score <> a.score
+      AND g.start_date <= CAST(? AS TIMESTAMP) - INTERVAL {FINAL_AFTER_HOURS} HOUR
+    ORDER BY g.start_date, g.id
+"""
+
+
+def expected_home(home_rating, away_rating, home_field=HOME_FIELD):
+    """Elo win probability for the home team."""
+    return 1 / (1 + 10 ** ((away_rating - home_rating - home_field) / 400))
+
+
+def mov_multiplier(margin, winner_rating_diff):
+    """
+    Margin-of-victory multiplier: log-scaled margin, damped when the
+    favourite wins (so blowouts by strong teams don't inflate ratings).
+    """
+    return np.log(abs(margin) + 1) * 2.2 / (winner_rating_diff * 0.001 + 2.2)
+
+
+class EloEngine:
+    """
+    Online Elo ratings keyed by team_id. Each game is an O(1) dict update,
+    so a new ingest batch only costs its own games.
+    """
+
+    def __init__(self, state=None, k=K_FACTOR, home_field=HOME_FIELD, carryover=SEASON_CARRYOVER):
+        self.k = k
+        self.home_field = home_field
+        self.carryover = carryover
+        # team_id -> [rating, games_played, last_season, last_game_date]
+        self.teams = {}
+        if state is not None:
+            for row in state.itertuples(index=False):
+                self.teams[int(row.team_id)] = [
+                    float(row.rating), int(row.games_played), row.last_season, row.last_game_date
+                ]
+
+    def _team(self, team_id, season):
+        team = self.teams.setdefault(team_id, [ELO_BASE, 0, season, None])
+        if team[2] is None or season > team[2]:
+            # New season: regress toward the mean. A late game from an earlier
+            # season leaves last_season alone, so it cannot trigger a second regression
+            if team[2] is not None:
+                team[0] = ELO_BASE + (team[0] - ELO_BASE) * self.carryover
+            team[2] = season
+        return team
+
+    def apply_game(self, season, start_date, home_id, away_id, home_margin):
+        """Update both teams for one game; returns the pre-game log row."""
+        home = self._team(home_id, season)
+        away = self._team(away_id, season)
+        home_pre, away_pre = home[0], away[0]
+
+        p_home = expected_home(home_pre, away_pre, self.home_field)
+        home_won = home_margin > 0
+        # Rating gap from the winner's side, home field included
+        diff = home_pre + self.home_field - away_pre
+        winner_diff = diff if home_won else -diff
+        shift = self.k * mov_multiplier(home_margin, winner_diff) * (float(home_won) - p_home)
+
+        home[0] += shift
+        away[0] -= shift
+        for team in (home, away):
+            team[1] += 1
+            team[3] = start_date
+        return home_pre, away_pre, p_home, shift
+
+    def apply_games(self, games: pd.DataFrame):
+        """
+        Apply games (NEW_GAMES_SQL columns) in order. Returns the game log:
+        pre-game ratings, home win probability and rating shift per game.
+        """
+        log = [
+            self.apply_game(int(g.season), g.start_date, int(g.home_team_id), int(g.away_team_id), g.home_margin)
+            for g in games.itertuples(index=False)
+        ]
+        log = pd.DataFrame(log, columns=['home_rating_pre', 'away_rating_pre', 'home_win_prob', 'rating_shift'])
+        log.insert(0, 'game_id', games['game_id'].to_numpy())
+        log['home_team_id'] = games['home_team_id'].to_numpy()
+        log['away_team_id'] = games['away_team_id'].to_numpy()
+        log['home_margin'] = games['home_margin'].to_numpy()
+        return log
+
+    def ratings_frame(self, team_ids=None):
+        """Current state as rows for ncaa.bt.elo_ratings, best rating first."""
+        team_ids = self.teams.keys() if team_ids is None else team_ids
+        rows = [(t, *self.teams[t]) for t in team_ids]
+        ratings = pd.DataFrame(rows, columns=['team_id', 'rating', 'games_played', 'last_season', 'last_game_date'])
+        return ratings.sort_values('rating', ascending=False, kind='stable')
@@ -0,0 +1,172 @@
+"""
+In-process ranking API: arrays in, strengths, ranks and diagnostics out.
+
+Nothing here touches MotherDuck, Secret Manager, GCS or the request object,
+so backfills, benchmarks, notebooks and what-if tooling can rank games
+directly:
+
+    from engine import rank_games
+    result = rank_games(home_ids, away_ids, home_margins, min_games=4)
+    result.ranking.head(25)
+"""
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from bt_solver import align_params, fit_bradley_terry
+from comparisons import MIN_GAMES, GameSet, margin_weights
+from decay import decay_factors
+from ranking import ALPHA, ranking_frame
+
+
+@dataclass
+class RankingResult:
+    """
+    One BT fit. team_ids (sorted) and log_params describe the ranked teams;
+    ranking is ranking_frame() order (rank 1 first); game_set is the
+    filtered GameSet the model was fit on; unranked_team_ids are teams that
+    appeared in the input but failed the min-games or connectivity filter.
+    """
+    team_ids: np.ndarray
+    log_params: np.ndarray
+    ranking: pd.DataFrame
+    game_set: GameSet
+    unranked_team_ids: np.ndarray
+    diagnostics: dict = field(default_factory=dict)
+
+    @property
+    def strengths(self):
+        return np.exp(self.log_params)
+
+    @property
+    def ranks(self):
+        """Rank of each team in team_ids order."""
+        return self.ranking.set_index('team_id').loc[self.team_ids, 'rank'].to_numpy()
+
+    def win_probability(self, team_a_ids, team_b_ids):
+        """P(a beats b) on a neutral field for aligned arrays of ranked team ids."""
+        a = np.searchsorted(self.team_ids, np.asarray(team_a_ids, dtype=np.int64))
+        b = np.searchsorted(self.team_ids, np.asarray(team_b_ids, dtype=np.int64))
+        return 1 / (1 + np.exp(self.log_params[b] - self.log_params[a]))
+
+
+def games_from_results(home_ids, away_ids, margins, neutral=None):
+    """
+    GameSet with one row per decided game from home-perspective point
+    margins (home score - away score). Ties carry no winner and are dropped.
+    Returns (game_set, n_ties).
+    """
+    home_ids = np.asarray(home_ids, dtype=np.int64)
+    away_ids = np.asarray(away_ids, dtype=np.int64)
+    margins = np.asarray(margins, dtype=float)
+    if not len(home_ids) == len(away_ids) == len(margins):
+        raise ValueError("home_ids, away_ids and margins must have the same length")
+
+    decided = np.nan_to_num(margins) != 0
+    home_won = margins[decided] > 0
+    home, away = home_ids[decided], away_ids[decided]
+    home_sign = np.where(home_won, 1, -1)
+    if neutral is not None:
+        home_sign = np.where(np.asarray(neutral, dtype=bool)[decided], 0, home_sign)
+
+    game_set = GameSet.from_ids(
+        np.where(home_won, home, away),
+        np.where(home_won, away, home),
+        margin_weights(margins[decided]),
+        margins=np.abs(margins[decided]),
+        home_sign=home_sign,
+    )
+    return game_set, int((~decided).sum())
+
+
+def rank_game_set(game_set, alpha=ALPHA, min_games=MIN_GAMES, warm_start=None):
+    """
+    Min-games filter (in average-weight games), largest connected component
+    and a BT fit for any GameSet: per game, aggregated pairs or decayed.
+
+    warm_start is an earlier RankingResult or a (team_ids, log_params)
+    pair; teams it did not rank start at 0. Returns None when fewer than
+    two teams qualify.
+    """
+    start = time.perf_counter()
+    total_games = float(game_set.games.sum())
+    avg_weight = float(game_set.weights.sum()) / total_games if total_games else 0.0
+    team_mask, component_sizes = game_set.eligible_mask(min_games * avg_weight)
+    ranked = game_set.restrict_teams(team_mask)
+    if ranked.n_teams < 2:
+        return None
+
+    initial_params = None
+    if warm_start is not None:
+        if isinstance(warm_start, RankingResult):
+            warm_start = (warm_start.team_ids, warm_start.log_params)
+        initial_params = align_params(warm_start[0], warm_start[1], ranked.team_ids)
+
+    log_params, solver_info = fit_bradley_terry(ranked.win_matrix(), alpha=alpha, initial_params=initial_params)
+    only_wins, only_losses = ranked.record_flags()
+
+    diagnostics = {
+        **solver_info,
+        "warm_started": initial_params is not None and solver_info["solver"] == "sparse_ilsr",
+        "input_games": total_games,
+        "input_teams": game_set.n_teams,
+        "ranked_games": float(ranked.games.sum()),
+        "ranked_teams": ranked.n_teams,
+        "components": len(component_sizes),
+        "largest_component": int(component_sizes[0]) if len(component_sizes) else 0,
+        "undefeated_teams": int(only_wins.sum()),
+        "winless_teams": int(only_losses.sum()),
+        "alpha": alpha,
+        "min_games": min_games,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+    return RankingResult(
+        team_ids=ranked.team_ids,
+        log_params=log_params,
+        ranking=ranking_frame(ranked.team_ids, log_params),
+        game_set=ranked,
+        unranked_team_ids=game_set.team_ids[~team_mask],
+        diagnostics=diagnostics,
+    )
+
+
+def rank_games(home_ids, away_ids, margins, *, neutral=None, start_dates=None, half_life_days=None,
+               as_of=None, alpha=ALPHA, min_games=MIN_GAMES, warm_start=None):
+    """
+    Rank teams from raw game results with the same weighting, filters and
+    solver as the bradley_terry_rankings Cloud Function.
+
+    margins are home score - away score; neutral optionally flags
+    neutral-site games. With half_life_days, start_dates are required and
+    each game counts 0.5 ** (age_days / half_life_days) relative to as_of
+    (default: the latest start date). Returns a RankingResult, or None when
+    fewer than two teams qualify.
+    """
+    game_set, n_ties = games_from_results(home_ids, away_ids, margins, neutral)
+    if half_life_days:
+        if start_dates is None:
+            raise ValueError("start_dates are required when half_life_days is set")
+        start_dates = pd.to_datetime(np.asarray(start_dates))[np.nan_to_num(np.asarray(margins, dtype=float)) != 0]
+        as_of = start_dates.max() if as_of is None else as_of
+        game_set = game_set.scaled(decay_factors(start_dates, as_of, half_life_days))
+
+    result = rank_game_set(game_set, alpha=alpha, min_games=min_games, warm_start=warm_start)
+    if result is not None:
+        result.diagnostics.update({"ties_dropped": n_ties, "half_life_days": half_life_days})
+    return result
+
+
+def fit_season(season, game_set):
+    """
+    Process-pool worker: rank one season's (already min-games filtered)
+    pair totals. Returns (season, arrow_table, diagnostics).
+    """
+    result = rank_game_set(game_set, min_games=0)
+    if result is None:
+        return season, None, None
+    ranking = result.ranking
+    ranking['season'] = season
+    return season, pa.Table.from_pandas(ranking, preserve_index=False), result.diagnostics
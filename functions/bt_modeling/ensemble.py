@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import spsolve
+
+
+# PageRank-style damping for the eigenvector rating
+KEENER_DAMPING = 0.85
+
+
+def colley_ratings(game_counts):
+    """
+    Colley matrix ratings from the (winner x loser) game-count matrix:
+    (2I + diag(games) - N) r = 1 + (wins - losses) / 2, with N the
+    symmetric head-to-head game counts. The system is SPD and sparse.
+    """
+    wins = np.asarray(game_counts.sum(axis=1)).ravel()
+    losses = np.asarray(game_counts.sum(axis=0)).ravel()
+    played = game_counts + game_counts.T
+    colley = (sp.diags(2 + wins + losses) - played).tocsc()
+    return spsolve(colley, 1 + (wins - losses) / 2)
+
+
+def keener_ratings(win_matrix, damping=KEENER_DAMPING, tol=1e-10, max_iter=1000):
+    """
+    Eigenvector rating by sparse power iteration: every team passes its
+    score to the teams that beat it, in proportion to the weight of those
+    losses, with PageRank-style damping. Teams without a loss spread their
+    score uniformly. Returns (ratings summing to 1, iterations).
+    """
+    n_teams = win_matrix.shape[0]
+    # Row-stochastic chain over losers -> winners
+    votes = win_matrix.T.tocsr()
+    out_weight = np.asarray(votes.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    chain_t = (sp.diags(np.where(dangling, 0, 1 / np.where(dangling, 1, out_weight))) @ votes).T.tocsr()
+
+    ratings = np.full(n_teams, 1 / n_teams)
+    for iteration in range(1, max_iter + 1):
+        new = damping * (chain_t @ ratings + ratings[dangling].sum() / n_teams) + (1 - damping) / n_teams
+        if np.abs(new - ratings).sum() < tol:
+            return new, iteration
+        ratings = new
+    raise RuntimeError(f"Power iteration did not converge after {max_iter} iterations")
+
+
+def _ranks(values):
+    """Rank 1 = highest value (ties broken by position, like ranking_frame)."""
+    ranks = np.empty(len(values), dtype=np.int64)
+    ranks[np.argsort(-values, kind='stable')] = np.arange(1, len(values) + 1)
+    return ranks
+
+
+def fit_rating_ensemble(game_set, log_params, margin_ratings):
+    """
+    BT, Colley, Massey and Keener ratings side by side for one GameSet. BT
+    log-strengths and Massey ratings come from the caller's fits on the same
+    game set; Colley and Keener are solved here from the weighted win matrix
+    and game-count matrix, both built from the same index arrays. Returns
+    (wide frame, info per added model).
+    """
+    win_matrix = game_set.win_matrix()
+    game_counts = game_set.win_matrix(game_set.games)
+
+    colley = colley_ratings(game_counts)
+    keener, keener_iterations = keener_ratings(win_matrix)
+
+    strengths = np.exp(log_params)
+    ensemble = pd.DataFrame({
+        'team_id': game_set.team_ids,
+        'bt_strength': strengths,
+        'bt_rank': _ranks(strengths),
+        'colley_rating': colley,
+        'colley_rank': _ranks(colley),
+        'massey_rating': margin_ratings,
+        'massey_rank': _ranks(margin_ratings),
+        'keener_rating': keener,
+        'keener_rank': _ranks(keener),
+    })
+    ensemble['mean_rank'] = ensemble[['bt_rank', 'colley_rank', 'massey_rank', 'keener_rank']].mean(axis=1)
+    ensemble = ensemble.sort_values(['mean_rank', 'bt_rank'], kind='stable')
+
+    info = {
+        "keener": {"solver": "power_iteration", "iterations": keener_iterations},
+        "colley": {"solver": "spsolve"},
+    }
+    return ensemble, info
@@ -2,10 +2,46 @@ import functions_framework
 import duckdb
 import pandas as pd
 import numpy as np
-from choix import ilsr_pairwise
+import functools
 import os
+import io
+import time
+import traceback
+import pyarrow as pa
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
 from google.cloud import secretmanager
-import networkx as nx
+from google.cloud import storage
+
+from bt_solver import align_params, fit_bradley_terry
+from comparisons import (
+    MIN_GAMES,
+    SEASON_PAIR_TOTALS_SQL,
+    GameSet,
+    margin_weights,
+)
+from adjusted_stats import TEAM_GAMES_SQL, adjust_team_stats
+from artifacts import data_version, fetch_artifact, store_artifact
+from decay import decay_factors
+from elo import NEW_GAMES_SQL, EloEngine
+from engine import fit_season, rank_game_set
+from ensemble import fit_rating_ensemble
+from massey import fit_margin_ratings, margin_frame
+from preprocess import preprocess_pairs
+from season_sim import (
+    DEFAULT_CHUNK,
+    DEFAULT_SIMS,
+    UNRANKED_STRENGTH_PERCENTILE,
+    fbs_mask,
+    simulate_season,
+)
+from ranking import (
+    ALPHA,
+    bootstrap_intervals,
+    matchup_matrix,
+    matchup_pairs,
+    ranking_frame,
+)
 
 
 project_id = 'baratz00-ba882-fall25'
@@ -13,204 +49,333 @@ secret_id = 'MotherDuck'
 version_id = 'latest'
 bucket_name = "ba882-ncaa-project"
 
+
+@contextmanager
+def connect_motherduck():
+    """MotherDuck connection using the token in Secret Manager; closed on exit."""
+    sm = secretmanager.SecretManagerServiceClient()
+    secret_name = f'projects/{project_id}/secrets/{secret_id}/versions/{version_id}'
+    response = sm.access_secret_version(request={"name": secret_name})
+    md_token = response.payload.data.decode("UTF-8")
+    md = duckdb.connect(f'md:?motherduck_token={md_token}')
+    print("✓ Connected to MotherDuck")
+    try:
+        yield md
+    finally:
+        md.close()
+        print("Database connection closed")
+
+
+def json_errors(handler):
+    """HTTP handler wrapper: any uncaught exception becomes a 500 with its traceback."""
+    @functools.wraps(handler)
+    def wrapper(request):
+        try:
+            return handler(request)
+        except Exception as e:
+            print(f"\n❌ ERROR: {str(e)}")
+            print(f"Traceback:\n{traceback.format_exc()}")
+            return {"error": str(e), "traceback": traceback.format_exc()}, 500
+    return wrapper
+
+
+def load_warm_start(md, team_ids, half_life_days=None):
+    """
+    Full-precision log-strengths from the latest model_run_params run with
+    the same half-life (a decayed run falls back to the latest live run),
+    aligned to team_ids. Before any run has stored its parameters, the FLOAT
+    strengths of the latest model_ranking_history run are used instead.
+    Teams without a previous strength start at 0 (average). Returns None
+    when there is no previous run.
+    """
+    prev = pd.DataFrame()
+    for half_life in ([half_life_days, None] if half_life_days else [None]):
+        prev = md.execute("""
+            SELECT p.team_id, p.log_strength
+            FROM ncaa.bt.model_run_params p
+            WHERE p.updated_at = (
+                SELECT MAX(r.updated_at)
+                FROM ncaa.bt.model_runs r
+                JOIN ncaa.bt.model_run_params rp ON rp.updated_at = r.updated_at
+                WHERE r.half_life_days IS NOT DISTINCT FROM ?
+            )
+        """, [half_life]).df()
+        if not prev.empty:
+            break
+    if prev.empty:
+        prev = md.execute("""
+            SELECT team_id, LN(strength) AS log_strength
+            FROM ncaa.bt.model_ranking_history
+            WHERE updated_at = (SELECT MAX(updated_at) FROM ncaa.bt.model_ranking_history)
+        """).df()
+    if prev.empty:
+        return None
+
+    seeded = np.isin(team_ids, prev['team_id'].to_numpy()).sum()
+    print(f"✓ Warm start from previous run: {seeded}/{len(team_ids)} teams seeded, rest at 0")
+    return align_params(prev['team_id'].to_numpy(), prev['log_strength'].to_numpy(), team_ids)
+
+
+def upload_matchup_matrix(team_ids, probs, run_ts):
+    """
+    Store the n x n float32 matchup matrix as Parquet in GCS (one column
+    per opponent team_id, rows in the same team_id order). Writes a
+    timestamped copy plus latest.parquet; returns the latest path.
+    """
+    matrix_df = pd.DataFrame(probs, columns=[str(t) for t in team_ids])
+    matrix_df.insert(0, 'team_id', np.asarray(team_ids, dtype=np.int64))
+
+    buffer = io.BytesIO()
+    matrix_df.to_parquet(buffer, index=False)
+    bucket = storage.Client().bucket(bucket_name)
+    base = "bt/matchup_probs"
+    paths = [f"{base}/updated_at={run_ts:%Y%m%dT%H%M%S}/matrix.parquet", f"{base}/latest.parquet"]
+    for path in paths:
+        buffer.seek(0)
+        bucket.blob(path).upload_from_file(buffer, content_type="application/octet-stream")
+    return paths[-1]
+
+
+def parse_int_ranges(value):
+    """'1-5,8' -> [1, 2, 3, 4, 5, 8]; None/'' -> None (everything)."""
+    if not value:
+        return None
+    out = set()
+    for part in str(value).split(","):
+        part = part.strip()
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            out.update(range(int(lo), int(hi) + 1))
+        elif part:
+            out.add(int(part))
+    return sorted(out)
+
+
+SEASON_GAMES_SQL = """
+    SELECT
+        pc.home_team_id,
+        pc.away_team_id,
+        pc.home_won,
+        pc.score_margin,
+        g.week,
+        g.start_date
+    FROM ncaa.bt.pairwise_comparisons pc
+    JOIN ncaa.real_deal.dim_games g ON pc.game_id = g.id
+    WHERE g.season = ?
+    ORDER BY g.start_date, pc.game_id
+"""
+
+
+def run_backfill(md, season, weeks=None, min_games=MIN_GAMES, half_life_days=None):
+    """
+    Cumulative as-of BT rankings for every requested week of a season.
+
+    The season's games are loaded once and sorted by start_date, so each
+    week is a prefix of the same arrays. Each week's solve is warm-started
+    from the previous week, and all snapshots go in one bulk insert into
+    ncaa.bt.ranking_backfill, keyed by season, week and half-life so decayed
+    and undecayed backfills sit side by side and never touch live history.
+    With half_life_days, games are decayed relative to each week's as-of time.
+    """
+    print(f"\n🕰️ Backfilling season {season}, weeks={weeks or 'all'}...")
+    games_df = md.execute(SEASON_GAMES_SQL, [season]).df()
+    print(f"✓ Retrieved {len(games_df)} games for season {season}")
+    if games_df.empty:
+        return {"status": "no_games", "season": season}
+
+    season_games = GameSet.from_games(games_df)
+    start_dates = games_df['start_date'].to_numpy()
+    game_weeks = games_df['week'].to_numpy()
+    if weeks is None:
+        weeks = sorted(int(w) for w in np.unique(game_weeks))
+
+    snapshots, week_summary = [], []
+    prev = None
+    for week in weeks:
+        in_week = game_weeks == week
+        if not in_week.any():
+            print(f"  week {week}: no games, skipped")
+            continue
+
+        # As-of cutoff is the last kickoff of the week; games are date-sorted
+        as_of = start_dates[in_week].max()
+        n_games = np.searchsorted(start_dates, as_of, side='right')
+        week_games = season_games.subset(slice(0, n_games))
+        if half_life_days:
+            week_games = week_games.scaled(decay_factors(start_dates[:n_games], as_of, half_life_days))
+
+        # Same min-games, connectivity and fit as the live handler (engine.py)
+        result = rank_game_set(week_games, min_games=min_games, warm_start=prev)
+        if result is None:
+            print(f"  week {week}: no teams with ~{min_games} games yet, skipped")
+            continue
+        prev = result
+        ranked, solver_info = result.game_set, result.diagnostics
+
+        snapshot = result.ranking
+        snapshot['as_of'] = pd.Timestamp(as_of)
+        snapshot['season'] = season
+        snapshot['week'] = week
+        snapshots.append(snapshot)
+        week_summary.append({
+            "week": int(week),
+            "as_of": str(pd.Timestamp(as_of)),
+            "games": int(n_games),
+            "teams": ranked.n_teams,
+            "solver": solver_info["solver"],
+            "iterations": solver_info["iterations"],
+        })
+        print(f"  week {week}: {n_games} games, {ranked.n_teams} teams, "
+              f"{solver_info['solver']} {solver_info['iterations']} iterations")
+
+    if not snapshots:
+        return {"status": "no_rankings", "season": season, "weeks": week_summary}
+
+    backfill_df = pd.concat(snapshots, ignore_index=True)
+    backfill_df['half_life_days'] = half_life_days or 0
+    backfill_df['updated_at'] = pd.Timestamp.now()
+    # Replace whole (season, week, half-life) slices so teams a rerun no
+    # longer ranks don't linger from the previous backfill
+    md.execute("BEGIN TRANSACTION")
+    try:
+        md.execute("""
+            DELETE FROM ncaa.bt.ranking_backfill
+            WHERE season = ? AND list_contains(?, week) AND half_life_days = ?
+        """, [season, sorted(backfill_df['week'].unique().tolist()), half_life_days or 0])
+        md.execute("""
+            INSERT INTO ncaa.bt.ranking_backfill
+                (season, week, half_life_days, team_id, rank, strength, prob_vs_avg, as_of, updated_at)
+            SELECT season, week, half_life_days, team_id, rank, strength, prob_vs_avg, as_of, updated_at
+            FROM backfill_df
+        """)
+        md.execute("COMMIT")
+    except Exception:
+        md.execute("ROLLBACK")
+        raise
+    print(f"✓ Inserted {len(backfill_df)} backfilled records into ncaa.bt.ranking_backfill")
+
+    return {
+        "status": "success",
+        "mode": "backfill",
+        "season": season,
+        "half_life_days": half_life_days,
+        "records": len(backfill_df),
+        "weeks": week_summary,
+    }
+
+
+def last_cold_iterations(md, version, half_life_days=None):
+    """
+    Iteration count of the most recent cold-start sparse solve on the same
+    data version and half-life, either a cold run or the in-process cold
+    solve of a warm run. Returns None when there is none.
+    """
+    row = md.execute("""
+        SELECT CASE WHEN warm_started THEN cold_iterations ELSE iterations END AS cold
+        FROM ncaa.bt.model_runs
+        WHERE data_version = ?
+          AND half_life_days IS NOT DISTINCT FROM ?
+          AND cold IS NOT NULL
+        ORDER BY updated_at DESC
+        LIMIT 1
+    """, [version, half_life_days]).fetchone()
+    return row[0] if row else None
+
+
 @functions_framework.http
+@json_errors
 def bradley_terry_rankings(request):
     """
     Runs Bradley-Terry model on pairwise comparisons with margin-of-victory weighting
     """
-    try:
-        print("Starting Bradley-Terry rankings function...")
-        
-        # Get MotherDuck token
-        print("Accessing Secret Manager...")
-        sm = secretmanager.SecretManagerServiceClient()
-        secret_name = f'projects/{project_id}/secrets/{secret_id}/versions/{version_id}'
-        response = sm.access_secret_version(request={"name": secret_name})
-        md_token = response.payload.data.decode("UTF-8")
-        print("✓ Successfully retrieved MotherDuck token")
-        
-        # Connect to MotherDuck
-        print("Connecting to MotherDuck...")
-        md = duckdb.connect(f'md:?motherduck_token={md_token}')
-        print("✓ Connected to MotherDuck")
-        
-        # 1. Pull pairwise comparisons with statistics
-        print("Fetching pairwise comparisons from database...")
-        df = md.execute("""
-            SELECT 
-                home_team_id,
-                away_team_id,
-                home_won,
-                home_score,
-                away_score,
-                score_margin,
-                home_total_yards,
-                away_total_yards,
-                home_turnovers,
-                away_turnovers
-            FROM ncaa.bt.pairwise_comparisons
-        """).df()
-        print(f"✓ Retrieved {len(df)} games")
-        print(f"Sample data:\n{df.head()}")
-        
-        # 2. Get unique teams and create team index mapping
-        print("\nCreating team mappings...")
-        all_teams = pd.concat([df['home_team_id'], df['away_team_id']]).unique()
-        team_to_idx = {team: idx for idx, team in enumerate(all_teams)}
-        idx_to_team = {idx: team for team, idx in team_to_idx.items()}
-        n_teams = len(all_teams)
-        print(f"✓ Found {n_teams} unique teams")
-        
-        # 3. Convert team IDs to indices and apply margin-of-victory weighting
-        print("\nBuilding weighted comparison list...")
-        comparisons = []
-        
-        for _, row in df.iterrows():
-            home_idx = team_to_idx[row['home_team_id']]
-            away_idx = team_to_idx[row['away_team_id']]
-            
-            # Calculate weight based on margin of victory
-            # Use a logarithmic scale to prevent blowouts from dominating
-            margin = abs(row['score_margin']) if pd.notna(row['score_margin']) else 0
-            
-            # Weight function: log scale with cap at 3x
-            # This means: 7pt win ≈ 1x, 14pt ≈ 1.5x, 21pt ≈ 2x, 35pt+ ≈ 3x
-            if margin > 0:
-                weight = min(1 + np.log1p(margin) / 3, 3.0)
-            else:
-                weight = 1.0  # Default weight if no score data
-            
-            # Determine winner and add weighted comparisons
-            if row['home_won'] == 1:
-                winner_idx = home_idx
-                loser_idx = away_idx
-            else:
-                winner_idx = away_idx
-                loser_idx = home_idx
-            
-            # Add multiple copies of the comparison based on weight
-            # Round to nearest integer, minimum of 1
-            num_copies = max(1, round(weight))
-            comparisons.extend([(winner_idx, loser_idx)] * num_copies)
+    print("Starting Bradley-Terry rankings function...")
+    with connect_motherduck() as md:
+        warm_start = request.args.get("warm_start", "true").lower() != "false"
+        n_boot = int(request.args.get("bootstrap", 0))
+        half_life_days = request.args.get("half_life_days")
+        half_life_days = float(half_life_days) if half_life_days else None
         
-        print(f"✓ Created {len(comparisons)} weighted comparisons from {len(df)} games")
-        print(f"Average weight per game: {len(comparisons) / len(df):.2f}x")
-        print(f"First 5 comparisons: {comparisons[:5]}")
+        # Backfill mode: as-of rankings for past weeks of one season
+        season = request.args.get("season")
+        if season:
+            return run_backfill(
+                md,
+                int(season),
+                weeks=parse_int_ranges(request.args.get("weeks")),
+                min_games=float(request.args.get("min_games", MIN_GAMES)),
+                half_life_days=half_life_days,
+            ), 200
         
-        # 4. Filter teams by minimum games played
-        print("\nFiltering teams by minimum games played...")
-        team_game_count = {}
-        for winner, loser in comparisons:
-            team_game_count[winner] = team_game_count.get(winner, 0) + 1
-            team_game_count[loser] = team_game_count.get(loser, 0) + 1
-
-        # Note: game count is now based on weighted comparisons
-        # Adjust threshold accordingly (multiply by average weight)
-        avg_weight = len(comparisons) / len(df)
-        min_games_weighted = int(4 * avg_weight)  # Equivalent to ~4 actual games
+        # 1-6. Preprocessed pairs and connectivity, from the artifact cache when
+        # pairwise_comparisons has not changed since it was built
+        use_cache = request.args.get("cache", "true").lower() != "false" and not half_life_days
+        version = data_version(md)
+        artifact = None
+        if use_cache:
+            bucket = storage.Client().bucket(bucket_name)
+            artifact = fetch_artifact(version, bucket)
+        if artifact is None:
+            artifact = preprocess_pairs(md, half_life_days)
+            if use_cache:
+                store_artifact(version, artifact, bucket)
+        (total_games, total_teams, avg_weight), pair_set, team_mask, component_sizes = artifact
         
-        eligible_teams = {team for team, count in team_game_count.items() if count >= min_games_weighted}
-        print(f"✓ {len(eligible_teams)} teams have played at least ~4 games (weighted threshold: {min_games_weighted})")
-        print(f"  Filtered out {len(team_game_count) - len(eligible_teams)} teams")
-
-        # Filter comparisons to only include eligible teams
-        filtered_comparisons = [
-            (w, l) for w, l in comparisons 
-            if w in eligible_teams and l in eligible_teams
-        ]
-        print(f"✓ Filtered to {len(filtered_comparisons)} comparisons between eligible teams")
-        
-        # 5. Check connectivity
-        print("\nChecking graph connectivity...")
-        G = nx.Graph()
-        for winner_idx, loser_idx in filtered_comparisons:
-            G.add_edge(winner_idx, loser_idx)
-        
-        print(f"Graph has {G.number_of_nodes()} nodes and {G.number_of_edges()} edges")
-        print(f"Number of connected components: {nx.number_connected_components(G)}")
-        
-        # Get all connected components and their sizes
-        components = list(nx.connected_components(G))
-        component_sizes = [len(c) for c in components]
-        print(f"Component sizes: {sorted(component_sizes, reverse=True)}")
-        
-        # Get the largest connected component
-        largest_cc = max(components, key=len)
-        print(f"✓ Largest connected component has {len(largest_cc)} teams")
-        
-        # 6. Filter to largest connected component
-        print("\nFiltering to largest connected component...")
-        final_comparisons = [
-            (w, l) for w, l in filtered_comparisons 
-            if w in largest_cc and l in largest_cc
-        ]
-        print(f"✓ Final dataset: {len(final_comparisons)} weighted comparisons")
+        if team_mask.sum() < 2:
+            return {"status": "no_rankings", "total_games": total_games, "half_life_days": half_life_days}, 200
         
         # 7. Remap team indices to be contiguous (0 to n-1)
         print("\nRemapping team indices...")
-        connected_teams = sorted(list(largest_cc))
-        new_team_to_idx = {old_idx: new_idx for new_idx, old_idx in enumerate(connected_teams)}
-        idx_to_team_connected = {new_idx: idx_to_team[old_idx] for old_idx, new_idx in zip(connected_teams, range(len(connected_teams)))}
-        
-        remapped_comparisons = [(new_team_to_idx[w], new_team_to_idx[l]) for w, l in final_comparisons]
-        print(f"✓ Remapped {len(remapped_comparisons)} comparisons")
-        print(f"Number of teams in connected component: {len(connected_teams)}")
-        print(f"First 5 remapped comparisons: {remapped_comparisons[:5]}")
-        
-        # Verify remapped comparisons are valid
-        max_idx = max(max(w, l) for w, l in remapped_comparisons)
-        print(f"Max index in remapped comparisons: {max_idx}")
-        print(f"Expected max index: {len(connected_teams) - 1}")
+        final_set = pair_set.restrict_teams(team_mask)
+        connected_teams = final_set.team_ids
+        final_weights, final_games = final_set.weights, final_set.games
+        print(f"✓ Final dataset: {len(final_set)} pairs, {final_games.sum():.0f} games")
+        print(f"Number of teams in connected component: {final_set.n_teams}")
         
         # 8. Check for teams with perfect records (for informational purposes only)
         print("\nChecking for teams with perfect records...")
-        team_wins = {}
-        team_losses = {}
-        for winner, loser in remapped_comparisons:
-            team_wins[winner] = team_wins.get(winner, 0) + 1
-            team_losses[loser] = team_losses.get(loser, 0) + 1
-
-        all_team_indices = set(range(len(connected_teams)))
-        teams_only_winning = [t for t in all_team_indices if t in team_wins and t not in team_losses]
-        teams_only_losing = [t for t in all_team_indices if t in team_losses and t not in team_wins]
+        only_wins, only_losses = final_set.record_flags()
+        teams_only_winning = np.flatnonzero(only_wins)
+        teams_only_losing = np.flatnonzero(only_losses)
 
         print(f"Teams with only wins: {len(teams_only_winning)}")
         print(f"Teams with only losses: {len(teams_only_losing)}")
 
-        if teams_only_winning:
-            print(f"  Undefeated teams (indices): {teams_only_winning[:10]}")
-        if teams_only_losing:
-            print(f"  Winless teams (indices): {teams_only_losing[:10]}")
+        if len(teams_only_winning):
+            print(f"  Undefeated teams (ids): {connected_teams[teams_only_winning[:10]].tolist()}")
+        if len(teams_only_losing):
+            print(f"  Winless teams (ids): {connected_teams[teams_only_losing[:10]].tolist()}")
         
         # Note: We're NOT adding regularization - margin weighting handles this naturally
         print("✓ Using weighted comparisons only (no artificial regularization)")
         
-        # 9. Run Bradley-Terry model
+        # 9. Run Bradley-Terry model on the sparse weighted win matrix
         print("\n📊 Running Bradley-Terry model with margin-of-victory weighting...")
-        print(f"Input: {len(connected_teams)} teams, {len(remapped_comparisons)} weighted comparisons")
+        print(f"Input: {len(connected_teams)} teams, {final_games.sum():.0f} games, total weight {final_weights.sum():.1f}")
         
-        try:
-            log_params = ilsr_pairwise(
-                len(connected_teams), 
-                remapped_comparisons,
-                alpha=0.01  # Small regularization for numerical stability
-            )
-            print("✓ Bradley-Terry model completed successfully!")
-        except Exception as bt_error:
-            print(f"Standard method failed: {bt_error}")
-            print("Trying dense matrix approach...")
-            from choix import ilsr_pairwise_dense
-            
-            # Create win matrix
-            win_matrix = np.zeros((len(connected_teams), len(connected_teams)))
-            for winner, loser in remapped_comparisons:
-                win_matrix[winner, loser] += 1
-            
-            print(f"Win matrix shape: {win_matrix.shape}")
-            print(f"Total comparisons in matrix: {win_matrix.sum()}")
-            
-            log_params = ilsr_pairwise_dense(win_matrix, alpha=0.01)
-            print("✓ Bradley-Terry model completed with dense method!")
+        initial_params = load_warm_start(md, connected_teams, half_life_days) if warm_start else None
+        
+        # Filters are already applied, so the engine only fits and ranks
+        result = rank_game_set(
+            final_set,
+            alpha=ALPHA,
+            min_games=0,
+            warm_start=(connected_teams, initial_params) if initial_params is not None else None,
+        )
+        log_params, solver_info = result.log_params, result.diagnostics
+        warm_started = solver_info["warm_started"]
+        print(f"✓ Bradley-Terry model completed with {solver_info['solver']} ({solver_info['iterations']} iterations)")
+        
+        # Savings are measured against a cold solve of this same input: a stored
+        # one when this data version was already solved cold, else one run here
+        # (recorded in model_runs.cold_iterations for the next run)
+        iterations_saved, measured_cold = None, None
+        if warm_started:
+            cold_iterations = last_cold_iterations(md, version, half_life_days)
+            if cold_iterations is None:
+                _, cold_info = fit_bradley_terry(final_set.win_matrix(), alpha=ALPHA)
+                cold_iterations = measured_cold = cold_info["iterations"]
+            iterations_saved = cold_iterations - solver_info["iterations"]
+            print(f"✓ Warm start saved {iterations_saved} iterations vs cold solve on the same data ({cold_iterations})")
         
         strengths = np.exp(log_params)
         print(f"✓ Calculated {len(strengths)} team strengths")
@@ -220,87 +385,671 @@ def bradley_terry_rankings(request):
         avg_strength = np.mean(strengths)
         print(f"\nAverage team strength: {avg_strength:.4f}")
         
-        # 11. Calculate win probability vs average team for each team
-        print("\nCalculating win probabilities...")
-        win_probs = []
-        for new_idx, strength in enumerate(strengths):
-            team_id = idx_to_team_connected[new_idx]
-            prob_vs_avg = strength / (strength + avg_strength)
-            win_probs.append({
-                'team_id': int(team_id),
-                'strength': float(strength),
-                'prob_vs_avg': float(prob_vs_avg)
-            })
-        
-        print(f"✓ Calculated probabilities for {len(win_probs)} teams")
-        
-        # 12. Convert to DataFrame
-        print("\nCreating DataFrame...")
-        win_probs_df = pd.DataFrame(win_probs)
-        print(f"✓ DataFrame shape: {win_probs_df.shape}")
-        print(f"DataFrame preview:\n{win_probs_df.head()}")
-        
-        # Add timestamp
+        # 11-13. Win probability vs average team, sorted and ranked (vectorized)
+        print("\nCalculating win probabilities and ranks...")
+        win_probs_df = result.ranking
         win_probs_df['updated_at'] = pd.Timestamp.now()
-        
-        # 13. Sort by prob_vs_avg and assign ranks
-        print("\nSorting and ranking...")
-        win_probs_df = win_probs_df.sort_values('prob_vs_avg', ascending=False)
-        win_probs_df['rank'] = range(1, len(win_probs_df) + 1)
-        print(f"✓ Assigned ranks to all teams")
+        print(f"✓ Calculated probabilities for {len(win_probs_df)} teams")
         print(f"Top 5 teams:\n{win_probs_df.head()}")
         
-        # 14. Insert into database
-        print("\nInserting results into database history...")
-        md.execute("""
-            INSERT INTO ncaa.bt.model_ranking_history 
-            SELECT 
-                team_id,
-                rank,
-                strength,
-                prob_vs_avg,
-                updated_at
-            FROM win_probs_df
-        """)
+        # 14. Insert into database. Decayed runs go to their own table and
+        # never replace the published rankings, history or matchup tables
+        run_ts = win_probs_df['updated_at'].iloc[0]
+        if half_life_days:
+            print(f"\nInserting decayed results (half-life {half_life_days:g} days)...")
+            md.execute("""
+                INSERT INTO ncaa.bt.decayed_rankings
+                    (half_life_days, team_id, rank, strength, prob_vs_avg, updated_at)
+                SELECT
+                    ?,
+                    team_id,
+                    rank,
+                    strength,
+                    prob_vs_avg,
+                    updated_at
+                FROM win_probs_df
+            """, [half_life_days])
+            print(f"✓ Inserted {len(win_probs_df)} records into ncaa.bt.decayed_rankings")
+        else:
+            print("\nInserting results into database history...")
+            md.execute("""
+                INSERT INTO ncaa.bt.model_ranking_history
+                    (team_id, rank, strength, prob_vs_avg, updated_at)
+                SELECT 
+                    team_id,
+                    rank,
+                    strength,
+                    prob_vs_avg,
+                    updated_at
+                FROM win_probs_df
+            """)
 
-        print(f"✓ Inserted {len(win_probs_df)} records into ncaa.bt.model_ranking_history")
+            print(f"✓ Inserted {len(win_probs_df)} records into ncaa.bt.model_ranking_history")
+            
+            md.execute("""
+                CREATE OR REPLACE TABLE ncaa.bt.rankings AS (
+                SELECT 
+                    team_id,
+                    rank,
+                    strength,
+                    prob_vs_avg,
+                    updated_at
+                FROM win_probs_df)
+            """)
+            print(f"✓ Replaced ncaa.bt.rankings with {len(win_probs_df)} current rankings")
         
         md.execute("""
-            CREATE OR REPLACE TABLE ncaa.bt.rankings AS (
-            SELECT 
-                team_id,
-                rank,
-                strength,
-                prob_vs_avg,
-                updated_at
-            FROM win_probs_df)
+            INSERT INTO ncaa.bt.model_runs
+                (updated_at, solver, warm_started, iterations, num_teams, num_games,
+                 half_life_days, data_version, cold_iterations)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            run_ts,
+            solver_info["solver"],
+            warm_started,
+            solver_info["iterations"],
+            len(connected_teams),
+            total_games,
+            half_life_days,
+            version,
+            measured_cold,
+        ])
+        
+        # Full-precision log-strengths to warm-start the next run
+        params_df = pd.DataFrame({'team_id': connected_teams, 'log_strength': log_params})
+        params_df['updated_at'] = run_ts
+        md.execute("""
+            INSERT INTO ncaa.bt.model_run_params (updated_at, team_id, log_strength)
+            SELECT updated_at, team_id, log_strength
+            FROM params_df
         """)
-        print(f"✓ Replaced ncaa.bt.rankings with {len(win_probs_df)} current rankings")
+        print(f"✓ Stored {len(params_df)} log-strengths in ncaa.bt.model_run_params")
+        
+        # 14a. Point-margin (Massey/SRS) ratings from the same filtered game set
+        print("\n📊 Fitting margin ratings with home-field advantage...")
+        ratings, home_field, margin_info = fit_margin_ratings(final_set)
+        print(f"✓ LSQR converged in {margin_info['iterations']} iterations, home field {home_field:.2f} pts")
+        
+        margin_df = margin_frame(connected_teams, ratings)
+        margin_df['home_field'] = home_field
+        margin_df['updated_at'] = run_ts
+        if half_life_days:
+            md.execute("""
+                INSERT INTO ncaa.bt.decayed_margin_ratings
+                    (half_life_days, team_id, rank, rating, home_field, updated_at)
+                SELECT ?, team_id, rank, rating, home_field, updated_at
+                FROM margin_df
+            """, [half_life_days])
+            print(f"✓ Inserted {len(margin_df)} margin ratings into ncaa.bt.decayed_margin_ratings")
+        else:
+            md.execute("""
+                INSERT INTO ncaa.bt.margin_ratings
+                    (team_id, rank, rating, home_field, updated_at)
+                SELECT team_id, rank, rating, home_field, updated_at
+                FROM margin_df
+            """)
+            print(f"✓ Inserted {len(margin_df)} margin ratings into ncaa.bt.margin_ratings")
+        
+        artifact_path, ensemble_teams = None, None
+        if not half_life_days:
+            # 14b. All-pairs matchup probabilities for O(1) head-to-head lookups
+            print("\nMaterializing matchup probability matrix...")
+            probs = matchup_matrix(strengths)
+            artifact_path = upload_matchup_matrix(connected_teams, probs, run_ts)
+            print(f"✓ Uploaded {probs.shape[0]}x{probs.shape[1]} float32 matrix to gs://{bucket_name}/{artifact_path}")
+            
+            matchup_df = matchup_pairs(connected_teams, probs)
+            matchup_df['updated_at'] = run_ts
+            md.execute("BEGIN TRANSACTION")
+            try:
+                md.execute("DELETE FROM ncaa.bt.matchup_probs")
+                md.execute("""
+                    INSERT INTO ncaa.bt.matchup_probs
+                        (team_a_id, team_b_id, prob_a_wins, updated_at)
+                    SELECT
+                        team_a_id,
+                        team_b_id,
+                        prob_a_wins,
+                        updated_at
+                    FROM matchup_df
+                """)
+                md.execute("COMMIT")
+            except Exception:
+                md.execute("ROLLBACK")
+                raise
+            print(f"✓ Replaced ncaa.bt.matchup_probs with {len(matchup_df)} team pairs")
+            
+            # 14c. Colley and Keener next to the BT and margin fits above, all
+            # from the same filtered game set
+            print("\n📊 Fitting Colley and Keener ratings for the ensemble...")
+            ensemble_df, ensemble_info = fit_rating_ensemble(final_set, log_params, ratings)
+            ensemble_df['updated_at'] = run_ts
+            md.execute("BEGIN TRANSACTION")
+            try:
+                md.execute("DELETE FROM ncaa.bt.rating_ensemble")
+                md.execute("""
+                    INSERT INTO ncaa.bt.rating_ensemble
+                        (team_id, bt_strength, bt_rank, colley_rating, colley_rank,
+                         massey_rating, massey_rank, keener_rating, keener_rank, mean_rank, updated_at)
+                    SELECT
+                        team_id, bt_strength, bt_rank, colley_rating, colley_rank,
+                        massey_rating, massey_rank, keener_rating, keener_rank, mean_rank, updated_at
+                    FROM ensemble_df
+                """)
+                md.execute("COMMIT")
+            except Exception:
+                md.execute("ROLLBACK")
+                raise
+            ensemble_teams = len(ensemble_df)
+            print(f"✓ Replaced ncaa.bt.rating_ensemble with {ensemble_teams} teams "
+                  f"(Keener {ensemble_info['keener']['iterations']} iterations)")
+        
+        # 14d. Optional bootstrap confidence bands, reusing the filtered pair arrays
+        if n_boot > 0 and half_life_days:
+            print("⚠️ Bootstrap intervals are only stored for undecayed runs, skipped")
+            n_boot = 0
+        if n_boot > 0:
+            print(f"\nBootstrapping {n_boot} refits for confidence intervals...")
+            intervals_df = bootstrap_intervals(final_set, log_params, n_boot)
+            intervals_df['updated_at'] = run_ts
+            md.execute("""
+                INSERT INTO ncaa.bt.ranking_intervals
+                    (team_id, strength_lower, strength_median, strength_upper,
+                     rank_best, rank_median, rank_worst, n_boot, updated_at)
+                SELECT
+                    team_id, strength_lower, strength_median, strength_upper,
+                    rank_best, rank_median, rank_worst, n_boot, updated_at
+                FROM intervals_df
+            """)
+            print(f"✓ Inserted {len(intervals_df)} 95% intervals into ncaa.bt.ranking_intervals")
         
         # 15. Get top 25 for response
         top_25 = win_probs_df.head(25)
         
         print("\n✅ Function completed successfully!")
-        print(f"📊 Weighting resulted in {len(remapped_comparisons)}/{len(df)} = {len(remapped_comparisons)/len(df):.2f}x average weight per game")
+        print(f"📊 Weighting resulted in {final_weights.sum():.1f}/{final_games.sum():.0f} = {final_weights.sum() / final_games.sum():.2f}x average weight per game")
         
         # Return results
         return {
             "status": "success",
             "top_25_teams": top_25.to_dict(orient='records'),
-            "total_teams": n_teams,
+            "total_teams": total_teams,
             "connected_teams": len(connected_teams),
-            "total_games": len(df),
-            "weighted_comparisons": len(remapped_comparisons),
-            "average_weight": round(len(remapped_comparisons) / len(df), 2)
+            "total_games": total_games,
+            "ranked_games": round(float(final_games.sum()), 1),
+            "weighted_comparisons": round(float(final_weights.sum()), 2),
+            "average_weight": round(float(final_weights.sum() / final_games.sum()), 2),
+            "solver": solver_info["solver"],
+            "solver_iterations": solver_info["iterations"],
+            "warm_started": warm_started,
+            "iterations_saved": iterations_saved,
+            "bootstrap_samples": n_boot,
+            "half_life_days": half_life_days,
+            "margin_home_field": round(float(home_field), 2),
+            "margin_solver_iterations": margin_info["iterations"],
+            "matchup_matrix": f"gs://{bucket_name}/{artifact_path}" if artifact_path else None,
+            "ensemble_teams": ensemble_teams,
         }, 200
         
-    except Exception as e:
-        print(f"\n❌ ERROR: {str(e)}")
-        import traceback
-        print(f"Traceback:\n{traceback.format_exc()}")
-        return {"error": str(e), "traceback": traceback.format_exc()}, 500
-    
-    finally:
-        if 'md' in locals():
-            md.close()
-            print("Database connection closed")
+
+# What-if model held in memory by warm instances between invocations
+WHAT_IF_TTL_SECONDS = 600
+_what_if = {}
+
+
+def load_what_if_model():
+    """
+    Fill _what_if with the current filtered GameSet, its win matrix and a BT
+    fit warm-started from the latest live run. Reloaded after WHAT_IF_TTL_SECONDS.
+    """
+    if _what_if and time.monotonic() - _what_if["loaded_at"] < WHAT_IF_TTL_SECONDS:
+        return _what_if
+
+    with connect_motherduck() as md:
+        bucket = storage.Client().bucket(bucket_name)
+        cache_key = data_version(md)
+        artifact = fetch_artifact(cache_key, bucket)
+        if artifact is None:
+            artifact = preprocess_pairs(md)
+            store_artifact(cache_key, artifact, bucket)
+        _, pair_set, team_mask, _ = artifact
+        game_set = pair_set.restrict_teams(team_mask)
+        initial_params = load_warm_start(md, game_set.team_ids)
+
+    win_matrix = game_set.win_matrix()
+    log_params, solver_info = fit_bradley_terry(win_matrix, alpha=ALPHA, initial_params=initial_params)
+    _what_if.update({
+        "game_set": game_set,
+        "win_matrix": win_matrix,
+        "log_params": log_params,
+        "ranking": ranking_frame(game_set.team_ids, log_params).set_index('team_id'),
+        "loaded_at": time.monotonic(),
+    })
+    print(f"✓ Cached what-if model: {game_set.n_teams} teams, {len(game_set)} pairs, "
+          f"{solver_info['solver']} {solver_info['iterations']} iterations")
+    return _what_if
+
+
+def _parse_team_id(value):
+    """Team id from a JSON number or numeric string; None if it is not an integer."""
+    if isinstance(value, bool):
+        return None
+    try:
+        as_float = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(as_float) if np.isfinite(as_float) and as_float == int(as_float) else None
+
+
+def parse_what_if_games(request):
+    """
+    Hypothetical results from a JSON body {"games": [{"winner_id", "loser_id",
+    "margin"}, ...]} or a single ?winner_id=&loser_id=&margin=.
+    Returns (games DataFrame, list of validation errors).
+    """
+    body = request.get_json(silent=True) or {}
+    games = body.get("games")
+    if games is None and request.args.get("winner_id"):
+        games = [{
+            "winner_id": request.args.get("winner_id"),
+            "loser_id": request.args.get("loser_id"),
+            "margin": request.args.get("margin"),
+        }]
+    if games is None:
+        return pd.DataFrame(), []
+    if not isinstance(games, list):
+        return pd.DataFrame(), ["games must be a list of {winner_id, loser_id, margin} objects"]
+
+    rows, errors = [], []
+    for i, g in enumerate(games):
+        if not isinstance(g, dict):
+            errors.append(f"game {i}: expected an object with winner_id, loser_id and margin")
+            continue
+        winner_id, loser_id = _parse_team_id(g.get("winner_id")), _parse_team_id(g.get("loser_id"))
+        if winner_id is None:
+            errors.append(f"game {i}: winner_id must be an integer team id, got {g.get('winner_id')!r}")
+        if loser_id is None:
+            errors.append(f"game {i}: loser_id must be an integer team id, got {g.get('loser_id')!r}")
+        if winner_id is not None and winner_id == loser_id:
+            errors.append(f"game {i}: winner_id and loser_id are the same team ({winner_id})")
+        try:
+            margin = float(g.get("margin") or 0)
+        except (TypeError, ValueError):
+            margin = np.nan
+        if not np.isfinite(margin) or margin < 0:
+            errors.append(f"game {i}: margin must be a non-negative number of points, got {g.get('margin')!r}")
+        rows.append({"winner_id": winner_id, "loser_id": loser_id, "margin": margin})
+
+    return pd.DataFrame(rows), errors
+
+
+@functions_framework.http
+@json_errors
+def what_if_rankings(request):
+    """
+    Re-ranks with one or more hypothetical results added to the current
+    season's games and returns the new top 25 with rank deltas. The fitted
+    model stays cached in the instance, and each what-if solve is
+    warm-started from the cached parameters.
+    """
+    start = time.perf_counter()
+    hypothetical, errors = parse_what_if_games(request)
+    if errors:
+        return {"error": "invalid games: " + "; ".join(errors)}, 400
+    if hypothetical.empty:
+        return {"error": "provide games=[{winner_id, loser_id, margin}] in the JSON body "
+                         "or winner_id/loser_id/margin parameters"}, 400
+
+    model = load_what_if_model()
+    game_set, ranking = model["game_set"], model["ranking"]
+    team_ids = game_set.team_ids
+
+    ids = np.concatenate([hypothetical['winner_id'].to_numpy(), hypothetical['loser_id'].to_numpy()])
+    unknown = sorted(set(ids.tolist()) - set(team_ids.tolist()))
+    if unknown:
+        return {"error": f"teams not in the current ranking: {unknown}"}, 400
+
+    # Hypothetical games go on top of the cached win matrix
+    win_matrix = model["win_matrix"] + GameSet(
+        team_ids,
+        np.searchsorted(team_ids, hypothetical['winner_id'].to_numpy()),
+        np.searchsorted(team_ids, hypothetical['loser_id'].to_numpy()),
+        margin_weights(hypothetical['margin'].to_numpy()),
+    ).win_matrix()
+    log_params, solver_info = fit_bradley_terry(
+        win_matrix, alpha=ALPHA, initial_params=model["log_params"]
+    )
+
+    what_if = ranking_frame(team_ids, log_params)
+    what_if['previous_rank'] = ranking.loc[what_if['team_id'], 'rank'].to_numpy()
+    what_if['rank_delta'] = what_if['previous_rank'] - what_if['rank']
+    involved = what_if[what_if['team_id'].isin(ids)]
+
+    return {
+        "status": "success",
+        "hypothetical_games": hypothetical.to_dict(orient='records'),
+        "top_25_teams": what_if.head(25).to_dict(orient='records'),
+        "involved_teams": involved.to_dict(orient='records'),
+        "solver": solver_info["solver"],
+        "solver_iterations": solver_info["iterations"],
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }, 200
+
+
+@functions_framework.http
+@json_errors
+def bradley_terry_rankings_batch(request):
+    """
+    Ranks several seasons at once (?seasons=2021-2025), one worker process
+    per season, and replaces their rows in ncaa.bt.season_rankings in a
+    single transaction.
+    """
+    seasons = parse_int_ranges(request.args.get("seasons"))
+    if not seasons:
+        return {"error": "seasons parameter is required, e.g. seasons=2021-2025"}, 400
+    print(f"Starting batch Bradley-Terry rankings for seasons {seasons}...")
+
+    with connect_motherduck() as md:
+        # One query for every season's pair totals (min-games filter applied per season)
+        pairs = md.execute(SEASON_PAIR_TOTALS_SQL, [seasons]).df()
+        print(f"✓ Retrieved {len(pairs)} (season, winner, loser) pairs")
+
+        jobs = []
+        for season, season_pairs in pairs.groupby('season'):
+            jobs.append((int(season), GameSet.from_pairs(season_pairs)))
+        if not jobs:
+            return {"status": "no_games", "seasons": seasons}, 200
+
+        # Seasons share no comparisons, so each one is fit in its own process
+        tables, season_summary = [], []
+        max_workers = min(len(jobs), os.cpu_count() or 1)
+        print(f"Fitting {len(jobs)} seasons on {max_workers} worker processes...")
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(fit_season, *job) for job in jobs]
+            for future in as_completed(futures):
+                season, table, solver_info = future.result()
+                if table is None:
+                    print(f"  season {season}: not enough games, skipped")
+                    continue
+                tables.append(table)
+                season_summary.append({"season": season, "teams": table.num_rows, **solver_info})
+                print(f"  season {season}: {table.num_rows} teams, {solver_info['solver']} "
+                      f"{solver_info['iterations']} iterations")
+
+        if not tables:
+            return {"status": "no_rankings", "seasons": seasons}, 200
+
+        season_rankings = pa.concat_tables(tables)
+        season_rankings = season_rankings.append_column(
+            'updated_at', pa.array([pd.Timestamp.now()] * season_rankings.num_rows, pa.timestamp('us'))
+        )
+        ranked_seasons = sorted(s["season"] for s in season_summary)
+
+        md.execute("BEGIN TRANSACTION")
+        try:
+            md.execute("DELETE FROM ncaa.bt.season_rankings WHERE list_contains(?, season)", [ranked_seasons])
+            md.execute("""
+                INSERT INTO ncaa.bt.season_rankings
+                    (season, team_id, rank, strength, prob_vs_avg, updated_at)
+                SELECT season, team_id, rank, strength, prob_vs_avg, updated_at
+                FROM season_rankings
+            """)
+            md.execute("COMMIT")
+        except Exception:
+            md.execute("ROLLBACK")
+            raise
+        print(f"✓ Wrote {season_rankings.num_rows} rows for seasons {ranked_seasons} to ncaa.bt.season_rankings")
+
+        return {
+            "status": "success",
+            "seasons": sorted(season_summary, key=lambda s: s["season"]),
+            "records": season_rankings.num_rows,
+        }, 200
+
+
+@functions_framework.http
+@json_errors
+def team_stats_adjusted(request):
+    """
+    Opponent-adjusted offense/defense for every bt.team_stats metric of one
+    season (?season=, default latest), solved as one sparse system with a
+    right-hand side per metric. Replaces that season in ncaa.bt.team_stats_adjusted.
+    """
+    print("Starting opponent-adjusted team stats function...")
+    with connect_motherduck() as md:
+
+        season = request.args.get("season")
+        season = int(season) if season else md.execute(
+            "SELECT MAX(season) FROM ncaa.real_deal.dim_games"
+        ).fetchone()[0]
+
+        team_games = md.execute(TEAM_GAMES_SQL, [season]).df()
+        print(f"✓ Retrieved {len(team_games)} team-game rows for season {season}")
+        if team_games.empty:
+            return {"status": "no_games", "season": season}, 200
+
+        adjusted_df, home_field = adjust_team_stats(team_games)
+        adjusted_df.insert(0, 'season', season)
+        adjusted_df['updated_at'] = pd.Timestamp.now()
+        print(f"✓ Adjusted {len(adjusted_df)} teams; home-field effects: "
+              f"{ {k: round(float(v), 3) for k, v in home_field.items()} }")
+
+        md.execute("BEGIN TRANSACTION")
+        try:
+            md.execute("DELETE FROM ncaa.bt.team_stats_adjusted WHERE season = ?", [season])
+            md.execute("INSERT INTO ncaa.bt.team_stats_adjusted BY NAME SELECT * FROM adjusted_df")
+            md.execute("COMMIT")
+        except Exception:
+            md.execute("ROLLBACK")
+            raise
+        print(f"✓ Wrote {len(adjusted_df)} rows to ncaa.bt.team_stats_adjusted")
+
+        return {
+            "status": "success",
+            "season": season,
+            "teams": len(adjusted_df),
+            "home_field": {k: round(float(v), 4) for k, v in home_field.items()},
+        }, 200
+
+
+SEASON_SCHEDULE_SQL = """
+    SELECT
+        g.id AS game_id,
+        g.week,
+        g.start_date,
+        h.team_id AS home_team_id,
+        a.team_id AS away_team_id,
+        CASE
+            WHEN h.score IS NULL OR a.score IS NULL THEN NULL  -- not final yet
+            WHEN h.score > a.score THEN 1
+            ELSE 0
+        END AS home_won
+    FROM ncaa.real_deal.dim_games g
+    JOIN ncaa.real_deal.fact_game_team h ON h.game_id = g.id AND h.home_away = 'home'
+    JOIN ncaa.real_deal.fact_game_team a ON a.game_id = g.id AND a.home_away = 'away'
+    WHERE g.season = ?
+    ORDER BY g.start_date
+"""
+
+
+@functions_framework.http
+@json_errors
+def season_simulations(request):
+    """
+    Simulates the rest of a season from the current BT strengths and writes
+    expected wins, top-4 and conference-title odds to ncaa.bt.season_simulations.
+
+    Only teams on the season's schedule are simulated. Games in dim_games
+    after as_of (default now), or without a final score, are the remaining
+    schedule; scored games up to as_of count toward current wins. Top-4 odds are among FBS teams: those in a
+    JSON body {"fbs": [<team_id>, ...]}, else teams scheduled for at least
+    half as many games as the median team (fbs_mask). Conference odds need
+    {"conferences": {"<team_id>": "SEC", ...}} in the body.
+    """
+    print("Starting season simulation function...")
+    with connect_motherduck() as md:
+
+        season = request.args.get("season")
+        season = int(season) if season else md.execute(
+            "SELECT MAX(season) FROM ncaa.real_deal.dim_games"
+        ).fetchone()[0]
+        as_of = pd.Timestamp(request.args.get("as_of") or pd.Timestamp.now())
+        n_sims = int(request.args.get("n_sims", DEFAULT_SIMS))
+        chunk_size = int(request.args.get("chunk_size", DEFAULT_CHUNK))
+        seed = request.args.get("seed")
+        body = request.get_json(silent=True) or {}
+
+        rankings = md.execute("SELECT team_id, strength FROM ncaa.bt.rankings").df()
+        games = md.execute(SEASON_SCHEDULE_SQL, [season]).df()
+        # Past games without a final score are simulated like future ones
+        is_played = (games['start_date'] <= as_of) & games['home_won'].notna()
+        played = games[is_played]
+        remaining = games[~is_played]
+        print(f"✓ Season {season} as of {as_of}: {len(played)} played, {len(remaining)} remaining games")
+        if remaining.empty:
+            return {"status": "no_remaining_games", "season": season, "as_of": str(as_of)}, 200
+
+        # Teams on this season's schedule. Those without a BT strength failed the
+        # min-games or connectivity filter (mostly FCS), so they get a low
+        # percentile of the ranked strengths rather than the average team's 1.0
+        unranked_strength = (
+            np.percentile(rankings['strength'], UNRANKED_STRENGTH_PERCENTILE) if len(rankings) else 1.0
+        )
+        scheduled = np.concatenate([games['home_team_id'].to_numpy(), games['away_team_id'].to_numpy()])
+        team_ids, games_scheduled = np.unique(scheduled, return_counts=True)
+        rankings = rankings[rankings['team_id'].isin(team_ids)]
+        strengths = np.full(len(team_ids), unranked_strength)
+        strengths[np.searchsorted(team_ids, rankings['team_id'].to_numpy())] = rankings['strength'].to_numpy()
+        print(f"✓ {len(team_ids)} scheduled teams, {len(rankings)} with a BT strength "
+              f"(others at {unranked_strength:.3f})")
+
+        home_won = played['home_won'].to_numpy() == 1
+        winner_ids = np.where(home_won, played['home_team_id'], played['away_team_id'])
+        current_wins = np.bincount(np.searchsorted(team_ids, winner_ids), minlength=len(team_ids))
+
+        conferences = None
+        if body.get("conferences"):
+            conf_map = {int(k): v for k, v in body["conferences"].items()}
+            conferences = [conf_map.get(int(t)) for t in team_ids]
+
+        if body.get("fbs"):
+            top_eligible = np.isin(team_ids, np.asarray(body["fbs"], dtype=np.int64))
+        else:
+            top_eligible = fbs_mask(games_scheduled)
+        print(f"✓ {top_eligible.sum()} teams eligible for the top 4")
+
+        print(f"Simulating {n_sims} seasons in chunks of {chunk_size}...")
+        sims_df = simulate_season(
+            team_ids,
+            strengths,
+            current_wins,
+            np.searchsorted(team_ids, remaining['home_team_id'].to_numpy()),
+            np.searchsorted(team_ids, remaining['away_team_id'].to_numpy()),
+            remaining['week'].to_numpy(),
+            n_sims=n_sims,
+            chunk_size=chunk_size,
+            conferences=conferences,
+            top_eligible=top_eligible,
+            seed=int(seed) if seed else None,
+        )
+        sims_df['season'] = season
+        sims_df['as_of'] = as_of
+        sims_df['n_sims'] = n_sims
+        sims_df['updated_at'] = pd.Timestamp.now()
+
+        md.execute("""
+            INSERT INTO ncaa.bt.season_simulations
+                (season, team_id, current_wins, expected_wins, prob_top4,
+                 prob_conf_title, n_sims, as_of, updated_at)
+            SELECT
+                season, team_id, current_wins, expected_wins, prob_top4,
+                prob_conf_title, n_sims, as_of, updated_at
+            FROM sims_df
+        """)
+        print(f"✓ Inserted {len(sims_df)} team simulations into ncaa.bt.season_simulations")
+
+        top = sims_df.sort_values('prob_top4', ascending=False).head(25)
+        return {
+            "status": "success",
+            "season": season,
+            "as_of": str(as_of),
+            "n_sims": n_sims,
+            "remaining_games": len(remaining),
+            "top_25_by_top4_odds": top.drop(columns=['as_of', 'updated_at']).to_dict(orient='records'),
+        }, 200
+
+
+@functions_framework.http
+@json_errors
+def elo_ratings(request):
+    """
+    Applies completed games that are not yet rated to the online Elo state
+    in ncaa.bt.elo_ratings, logging each game to ncaa.bt.elo_game_log.
+    Meant to run right after each scoreboard ingest; ?rebuild=true clears
+    the state and replays every game.
+    """
+    print("Starting Elo ratings function...")
+    with connect_motherduck() as md:
+
+        rebuild = request.args.get("rebuild", "false").lower() == "true"
+        run_ts = pd.Timestamp.now()
+
+        # One transaction from a rebuild's deletes to the final writes, so a
+        # failed replay leaves the previous state in place
+        md.execute("BEGIN TRANSACTION")
+        try:
+            if rebuild:
+                md.execute("DELETE FROM ncaa.bt.elo_game_log")
+                md.execute("DELETE FROM ncaa.bt.elo_ratings")
+                print("✓ Cleared Elo state for a full replay")
+
+            games = md.execute(NEW_GAMES_SQL, [run_ts]).df()
+            print(f"✓ {len(games)} new completed games to apply")
+            if games.empty:
+                md.execute("COMMIT")
+                return {"status": "up_to_date", "games_applied": 0}, 200
+
+            # Only the teams in this batch change, so only their state is loaded and written back
+            touched = np.unique(np.concatenate([games['home_team_id'].to_numpy(), games['away_team_id'].to_numpy()]))
+            state = md.execute("""
+                SELECT team_id, rating, games_played, last_season, last_game_date
+                FROM ncaa.bt.elo_ratings
+                WHERE list_contains(?, team_id)
+            """, [touched.tolist()]).df()
+            engine = EloEngine(state)
+
+            game_log = engine.apply_games(games)
+            game_log['updated_at'] = run_ts
+            ratings_df = engine.ratings_frame(touched.tolist())
+            ratings_df['updated_at'] = run_ts
+            print(f"✓ Applied {len(game_log)} games, {len(ratings_df)} teams updated")
+
+            md.execute("""
+                INSERT INTO ncaa.bt.elo_game_log
+                    (game_id, home_team_id, away_team_id, home_margin, home_rating_pre,
+                     away_rating_pre, home_win_prob, rating_shift, updated_at)
+                SELECT
+                    game_id, home_team_id, away_team_id, home_margin, home_rating_pre,
+                    away_rating_pre, home_win_prob, rating_shift, updated_at
+                FROM game_log
+            """)
+            md.execute("""
+                INSERT OR REPLACE INTO ncaa.bt.elo_ratings
+                    (team_id, rating, games_played, last_season, last_game_date, updated_at)
+                SELECT team_id, rating, games_played, last_season, last_game_date, updated_at
+                FROM ratings_df
+            """)
+            md.execute("COMMIT")
+        except Exception:
+            md.execute("ROLLBACK")
+            raise
+        print("✓ Wrote ncaa.bt.elo_game_log and ncaa.bt.elo_ratings")
+
+        return {
+            "status": "success",
+            "rebuild": rebuild,
+            "games_applied": len(game_log),
+            "teams_updated": len(ratings_df),
+            "through": str(games['start_date'].max()),
+            "top_10_updated_teams": ratings_df.head(10).drop(columns=['updated_at']).to_dict(orient='records'),
+        }, 200
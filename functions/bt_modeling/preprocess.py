@@ -0,0 +1,80 @@
+"""
+Steps 1-6 of the BT pipeline: pair totals, weighted pair arrays, min-games
+filter and the largest connected component.
+
+Takes any DuckDB connection with the warehouse attached as "ncaa", so the
+Cloud Function and benchmarks/bench_bt.py run the same code.
+"""
+import pandas as pd
+
+from comparisons import GAME_SUMMARY_SQL, MIN_GAMES, PAIR_TOTALS_SQL, GameSet
+from decay import update_decayed_pairs
+
+
+def load_pair_totals(md, half_life_days=None):
+    """
+    ((total_games, total_teams, avg_weight), pairs): one row per (winner,
+    loser, venue) with summed margin weights. Undecayed totals come from
+    PAIR_TOTALS_SQL with the min-games filter applied; decayed totals are
+    updated incrementally and still need filter_pairs().
+    """
+    summary = md.execute(GAME_SUMMARY_SQL).fetchone()
+    if half_life_days:
+        # Decay is measured back from the latest completed game, so rankings
+        # stay meaningful in the off-season
+        as_of = md.execute("""
+            SELECT MAX(g.start_date)
+            FROM ncaa.bt.pairwise_comparisons pc
+            JOIN ncaa.real_deal.dim_games g ON pc.game_id = g.id
+            WHERE g.start_date <= ?
+        """, [pd.Timestamp.now()]).fetchone()[0]
+        return summary, update_decayed_pairs(md, half_life_days, as_of)
+    return summary, md.execute(PAIR_TOTALS_SQL).df()
+
+
+def filter_pairs(pairs, half_life_days=None):
+    """
+    GameSet of the pair totals. Decayed pairs get the same min-games rule as
+    PAIR_TOTALS_SQL, in decayed (recent-equivalent) games; undecayed pairs
+    were already filtered in SQL.
+    """
+    pair_set = GameSet.from_pairs(pairs)
+    if half_life_days:
+        eligible, _ = pair_set.eligible_mask(MIN_GAMES * pair_set.weights.sum() / pair_set.games.sum())
+        pair_set = pair_set.restrict_teams(eligible)
+    return pair_set
+
+
+def preprocess_pairs(md, half_life_days=None):
+    """
+    Steps 1-6: pair totals, team index and weights, min-games filter and the
+    largest connected component. Returns (summary, pair_set, team_mask,
+    component_sizes) with summary = (total_games, total_teams, avg_weight).
+    """
+    # 1. Aggregate pairwise comparisons in DuckDB: one row per (winner, loser)
+    # pair with summed margin weights, min-games filter already applied
+    print("Fetching game totals from database...")
+    if half_life_days:
+        # Recency-decayed totals, updated incrementally from the last decayed run
+        print(f"Updating decayed pair totals (half-life {half_life_days:g} days)...")
+    else:
+        print("Fetching per-pair totals from database...")
+    summary, pairs = load_pair_totals(md, half_life_days)
+    total_games, total_teams, avg_weight = summary
+    print(f"✓ {total_games} games between {total_teams} teams (average weight {avg_weight:.2f}x)")
+    print(f"✓ Retrieved {len(pairs)} (winner, loser) pairs covering {pairs['games'].sum():.1f} games")
+    print(f"Sample data:\n{pairs.head()}")
+
+    # 2-3. Build team index and weighted pair arrays
+    print("\nBuilding weighted comparison arrays...")
+    pair_set = filter_pairs(pairs, half_life_days)
+    print(f"✓ {pair_set.n_teams} teams have played at least ~{MIN_GAMES} games ({pair_set.nbytes / 1024:.1f} KiB of arrays)")
+    print(f"  Filtered out {total_teams - pair_set.n_teams} teams")
+
+    # 4-6. Restrict to the largest connected component
+    print("\nChecking graph connectivity...")
+    team_mask, component_sizes = pair_set.component_mask()
+    print(f"Number of connected components: {len(component_sizes)}")
+    print(f"Component sizes: {component_sizes[:20].tolist()}")
+    print(f"✓ Largest connected component has {team_mask.sum()} teams")
+    return summary, pair_set, team_mask, component_sizes
@@ -0,0 +1,97 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from bt_solver import fit_bradley_terry
+
+
+# Small regularization for numerical stability
+ALPHA = 0.01
+
+
+def ranking_frame(team_ids, log_params):
+    """Strengths, probability vs. an average team and rank for one fit."""
+    strengths = np.exp(log_params)
+    ranking = pd.DataFrame({
+        'team_id': np.asarray(team_ids, dtype=np.int64),
+        'strength': strengths,
+        'prob_vs_avg': strengths / (strengths + strengths.mean()),
+    })
+    ranking = ranking.sort_values('prob_vs_avg', ascending=False, kind='stable')
+    ranking['rank'] = np.arange(1, len(ranking) + 1)
+    return ranking
+
+
+def matchup_matrix(strengths):
+    """P[i, j] = probability team i beats team j (float32, broadcast)."""
+    s = np.asarray(strengths, dtype=np.float32)
+    return s[:, None] / (s[:, None] + s[None, :])
+
+
+def matchup_pairs(team_ids, probs):
+    """
+    Upper triangle of the matchup matrix as rows with team_a_id < team_b_id
+    (team_ids must be sorted). P(b beats a) is 1 - prob_a_wins.
+    """
+    a, b = np.triu_indices(len(team_ids), k=1)
+    team_ids = np.asarray(team_ids, dtype=np.int64)
+    return pd.DataFrame({
+        'team_a_id': team_ids[a],
+        'team_b_id': team_ids[b],
+        'prob_a_wins': probs[a, b],
+    })
+
+
+def bootstrap_log_params(game_set, log_params, seeds, alpha=ALPHA):
+    """
+    Process-pool worker: one BT refit per seed on a game-level bootstrap
+    resample of the pair totals, warm-started from the full-sample fit.
+    """
+    games = game_set.games.astype(float)
+    per_game_weight = game_set.weights / games
+    game_share = games / games.sum()
+    total_games = int(round(games.sum()))
+
+    samples = np.empty((len(seeds), game_set.n_teams))
+    for i, seed in enumerate(seeds):
+        # Resample games with replacement; each pair keeps its average game weight
+        counts = np.random.default_rng(seed).multinomial(total_games, game_share)
+        samples[i], _ = fit_bradley_terry(
+            game_set.win_matrix(counts * per_game_weight),
+            alpha=alpha,
+            initial_params=log_params
+        )
+    return samples
+
+
+def bootstrap_intervals(game_set, log_params, n_boot, level=95.0, seed=None, max_workers=None):
+    """
+    Percentile bands for each team's strength and rank from n_boot
+    bootstrap refits, spread over a process pool.
+    """
+    seeds = np.random.SeedSequence(seed).generate_state(n_boot)
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, n_boot))
+    worker = partial(bootstrap_log_params, game_set, log_params)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        samples = np.vstack(list(pool.map(worker, np.array_split(seeds, max_workers))))
+
+    # Rank 1 = strongest within each replicate
+    ranks = (-samples).argsort(axis=1).argsort(axis=1) + 1
+    tail = (100 - level) / 2
+    percentiles = [tail, 50, 100 - tail]
+    strength_lo, strength_mid, strength_hi = np.percentile(np.exp(samples), percentiles, axis=0)
+    rank_lo, rank_mid, rank_hi = np.percentile(ranks, percentiles, axis=0)
+
+    return pd.DataFrame({
+        'team_id': game_set.team_ids,
+        'strength_lower': strength_lo,
+        'strength_median': strength_mid,
+        'strength_upper': strength_hi,
+        'rank_best': rank_lo,
+        'rank_median': rank_mid,
+        'rank_worst': rank_hi,
+        'n_boot': n_boot,
+    })
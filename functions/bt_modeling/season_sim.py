@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+DEFAULT_SIMS = 100_000
+# 10k sims x ~700 teams keeps each chunk's float32 win matrix under ~30 MB
+DEFAULT_CHUNK = 10_000
+TOP_N = 4
+# Scheduled teams without a BT strength (filtered out for too few games or
+# no connection to the main graph) play at this percentile of ranked strengths
+UNRANKED_STRENGTH_PERCENTILE = 5
+# The scoreboard feed carries FBS games, so FCS teams only appear for their
+# one or two games against FBS opponents
+FBS_MIN_SCHEDULE_SHARE = 0.5
+
+
+def fbs_mask(games_scheduled):
+    """Teams scheduled for at least half as many games as the median team."""
+    games_scheduled = np.asarray(games_scheduled)
+    return games_scheduled >= FBS_MIN_SCHEDULE_SHARE * np.median(games_scheduled)
+
+
+def _team_incidence(team_idx, n_teams):
+    """Sparse (n_teams x n_games) one-hot matrix: column g has a 1 at team_idx[g]."""
+    n_games = len(team_idx)
+    return sp.csr_matrix(
+        (np.ones(n_games, dtype=np.float32), (team_idx, np.arange(n_games))),
+        shape=(n_teams, n_games),
+    )
+
+
+def simulate_season(team_ids, strengths, current_wins, home_idx, away_idx, game_weeks,
+                    n_sims=DEFAULT_SIMS, chunk_size=DEFAULT_CHUNK, conferences=None,
+                    top_eligible=None, seed=None):
+    """
+    Monte Carlo over the remaining schedule using BT win probabilities.
+
+    Each week is one (games x sims) Bernoulli draw matrix; wins are
+    accumulated with sparse incidence products, so nothing loops over
+    simulations. Simulations run in chunks of chunk_size to bound memory.
+
+    conferences is an optional array of conference labels aligned with
+    team_ids (None/NaN = no conference). The conference title goes to the
+    member with the most total wins, ties broken by BT strength.
+    top_eligible is an optional boolean mask of the teams that can make the
+    top 4 (e.g. FBS only); the others get prob_top4 = 0. Returns one row per team.
+    """
+    team_ids = np.asarray(team_ids)
+    strengths = np.asarray(strengths, dtype=np.float32)
+    current_wins = np.asarray(current_wins, dtype=np.float32)
+    n_teams = len(team_ids)
+    rng = np.random.default_rng(seed)
+
+    # Per-week game slices, probabilities and incidence matrices are reused by every chunk
+    weeks = []
+    for week in np.unique(game_weeks):
+        in_week = game_weeks == week
+        h, a = home_idx[in_week], away_idx[in_week]
+        weeks.append((
+            strengths[h] / (strengths[h] + strengths[a]),
+            _team_incidence(h, n_teams),
+            _team_incidence(a, n_teams),
+        ))
+
+    # Ties on total wins go to the stronger team (fraction in [0, 1))
+    tiebreak = (np.argsort(np.argsort(strengths)) / n_teams).astype(np.float32)
+
+    top_teams = np.arange(n_teams) if top_eligible is None else np.flatnonzero(top_eligible)
+
+    conf_members = []
+    if conferences is not None:
+        labels = pd.Series(conferences, dtype=object)
+        for conf, members in labels.groupby(labels).groups.items():
+            conf_members.append(np.asarray(members))
+
+    total_wins = np.zeros(n_teams)
+    top_counts = np.zeros(n_teams)
+    conf_counts = np.zeros(n_teams)
+
+    done = 0
+    while done < n_sims:
+        size = min(chunk_size, n_sims - done)
+        # (n_teams x size) so the sparse incidence products stay on the left
+        wins = np.repeat(current_wins[:, None], size, axis=1)
+        for p_home, home_inc, away_inc in weeks:
+            home_won = (rng.random((len(p_home), size), dtype=np.float32) < p_home[:, None]).astype(np.float32)
+            wins += home_inc @ home_won
+            wins += away_inc @ (1 - home_won)
+
+        total_wins += wins.sum(axis=1)
+        score = wins + tiebreak[:, None]
+
+        if len(top_teams) > TOP_N:
+            top = np.argpartition(-score[top_teams], TOP_N - 1, axis=0)[:TOP_N]
+            top_counts += np.bincount(top_teams[top.ravel()], minlength=n_teams)
+        else:
+            top_counts[top_teams] += size
+
+        for members in conf_members:
+            champ = members[score[members].argmax(axis=0)]
+            conf_counts += np.bincount(champ, minlength=n_teams)
+
+        done += size
+
+    return pd.DataFrame({
+        'team_id': team_ids,
+        'current_wins': current_wins.astype(int),
+        'expected_wins': total_wins / n_sims,
+        'prob_top4': top_counts / n_sims,
+        'prob_conf_title': conf_counts / n_sims if conf_members else np.nan,
+    })
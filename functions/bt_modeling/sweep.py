@@ -0,0 +1,172 @@
+"""
+Hyperparameter sweep for the BT ranking: regularization (alpha), the
+margin weight curve (scale and cap) and the min-games threshold.
+
+Every config is scored by held-out log-likelihood with time-ordered
+cross-validation over ncaa.bt.pairwise_comparisons: fold k fits on all
+games before its cutoff and scores the next block of games. Configs run
+in a process pool that shares one copy of the game arrays via shared
+memory.
+
+    python sweep.py --alpha 0.001,0.01,0.1 --scale 2,3,4 --cap 2,3 --min-games 2,4
+"""
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from bt_solver import align_params
+from comparisons import MARGIN_WEIGHT_SCALE, MAX_MARGIN_WEIGHT, MIN_GAMES, GameSet, margin_weights
+from engine import rank_game_set
+from ranking import ALPHA
+
+
+GAMES_SQL = """
+    SELECT
+        pc.home_team_id,
+        pc.away_team_id,
+        pc.home_won,
+        pc.score_margin
+    FROM ncaa.bt.pairwise_comparisons pc
+    JOIN ncaa.real_deal.dim_games g ON pc.game_id = g.id
+    {where}
+    ORDER BY g.start_date, pc.game_id
+"""
+
+# Arrays packed into the shared block, in order
+SHARED_FIELDS = ["winners", "losers", "margins"]
+
+# Set in each worker by _attach_games()
+_games = {}
+
+
+def load_games(con, seasons=None):
+    """Time-ordered games as a GameSet plus the |margin| of each game."""
+    where = ""
+    if seasons:
+        where = f"WHERE g.season IN ({', '.join(str(int(s)) for s in seasons)})"
+    df = con.execute(GAMES_SQL.format(where=where)).df()
+
+    games = GameSet.from_games(df)
+    margins = np.abs(df['score_margin'].to_numpy(dtype=np.float32, na_value=0.0))
+    return games, margins
+
+
+def share_games(games, margins):
+    """
+    Copy the game arrays into one shared memory block.
+    Returns (block, dtypes) for _attach_games().
+    """
+    arrays = {"winners": games.winners, "losers": games.losers, "margins": margins}
+    dtypes = [arrays[name].dtype for name in SHARED_FIELDS]
+    shm = shared_memory.SharedMemory(create=True, size=sum(arrays[name].nbytes for name in SHARED_FIELDS))
+    offset = 0
+    for name, dtype in zip(SHARED_FIELDS, dtypes):
+        view = np.ndarray(len(games), dtype=dtype, buffer=shm.buf, offset=offset)
+        view[:] = arrays[name]
+        offset += view.nbytes
+    return shm, dtypes
+
+
+def _attach_games(shm_name, dtypes, n_games, team_ids, fold_cuts):
+    """Pool initializer: map the shared game arrays into this worker."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    offset = 0
+    for name, dtype in zip(SHARED_FIELDS, dtypes):
+        _games[name] = np.ndarray(n_games, dtype=dtype, buffer=shm.buf, offset=offset)
+        offset += _games[name].nbytes
+    _games["shm"] = shm  # keep the mapping alive
+    _games["team_ids"] = team_ids
+    _games["fold_cuts"] = fold_cuts
+
+
+def evaluate_config(config):
+    """Held-out log-likelihood of one config across the time-ordered folds."""
+    winners, losers, margins = _games["winners"], _games["losers"], _games["margins"]
+    team_ids, fold_cuts = _games["team_ids"], _games["fold_cuts"]
+    games = GameSet(team_ids, winners, losers, margin_weights(margins, scale=config["scale"], cap=config["cap"]))
+
+    total_ll, total_games, fold_ll = 0.0, 0, []
+    for train_end, test_end in zip(fold_cuts[:-1], fold_cuts[1:]):
+        train = games.subset(slice(0, train_end))
+        result = rank_game_set(train, alpha=config["alpha"], min_games=config["min_games"])
+        # Teams that were filtered out (or unseen) are scored as average
+        params = np.zeros(len(team_ids))
+        if result is not None:
+            params = align_params(result.team_ids, result.log_params, team_ids)
+
+        diff = params[winners[train_end:test_end]] - params[losers[train_end:test_end]]
+        ll = -np.logaddexp(0, -diff).sum()  # sum of log sigmoid(diff)
+        fold_ll.append(ll / (test_end - train_end))
+        total_ll += ll
+        total_games += test_end - train_end
+
+    return {**config, "log_likelihood": total_ll / total_games, "fold_log_likelihood": fold_ll}
+
+
+def fold_cutoffs(n_games, n_folds):
+    """Game indices splitting the time-ordered games into n_folds + 1 blocks."""
+    return np.linspace(0, n_games, n_folds + 2).astype(int)[1:]
+
+
+def parse_grid(value, cast=float):
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default=None,
+                        help="DuckDB path or md: URL (default: MotherDuck via MOTHERDUCK_TOKEN)")
+    parser.add_argument("--seasons", default=None, help="comma-separated seasons (default: all)")
+    parser.add_argument("--alpha", default=f"0.001,{ALPHA},0.1")
+    parser.add_argument("--scale", default=f"2,{MARGIN_WEIGHT_SCALE},4,6")
+    parser.add_argument("--cap", default=f"2,{MAX_MARGIN_WEIGHT},4")
+    parser.add_argument("--min-games", default=f"2,3,{MIN_GAMES},5")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default="sweep_results.csv")
+    args = parser.parse_args()
+
+    database = args.database or f"md:?motherduck_token={os.environ['MOTHERDUCK_TOKEN']}"
+    con = duckdb.connect(database)
+    games, margins = load_games(con, parse_grid(args.seasons, int) if args.seasons else None)
+    con.close()
+    print(f"✓ Loaded {len(games)} games between {games.n_teams} teams ({games.nbytes / 1024:.1f} KiB)")
+
+    configs = [
+        {"alpha": a, "scale": s, "cap": c, "min_games": m}
+        for a, s, c, m in itertools.product(
+            parse_grid(args.alpha), parse_grid(args.scale), parse_grid(args.cap), parse_grid(args.min_games)
+        )
+    ]
+    cuts = fold_cutoffs(len(games), args.folds)
+    print(f"Evaluating {len(configs)} configs x {args.folds} folds on {args.workers} workers...")
+
+    start = time.perf_counter()
+    shm, dtypes = share_games(games, margins)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_attach_games,
+            initargs=(shm.name, dtypes, len(games), games.team_ids, cuts),
+        ) as pool:
+            results = list(pool.map(evaluate_config, configs, chunksize=max(1, len(configs) // (4 * args.workers))))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    table = pd.DataFrame(results).sort_values("log_likelihood", ascending=False)
+    table.insert(0, "rank", np.arange(1, len(table) + 1))
+    table.to_csv(args.out, index=False)
+    print(f"✓ Swept {len(configs)} configs in {time.perf_counter() - start:.1f}s -> {args.out}")
+    print(table.drop(columns="fold_log_likelihood").head(20).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
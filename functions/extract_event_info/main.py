@@ -1,10 +1,11 @@
 import json
-import requests
 import functions_framework
 from google.cloud import storage
 import uuid
 import datetime
 
+from espn_client import espn
+
 project_id = 'baratz00-ba882-fall25'
 bucket_name = 'ba882-ncaa-project'
 
@@ -33,8 +34,7 @@ def task(request):
     print(f"🆔 run_id: {run_id}")
 
     # Call ESPN scoreboard API
-    url = f"{SCOREBOARD_URL}?dates={yyyymmdd}"
-    response = requests.get(url)
+    response = espn.get(SCOREBOARD_URL, params={"dates": yyyymmdd})
     if not response.ok:
         raise ValueError(f"Non-200 response: {response.status_code}")
 
@@ -0,0 +1,124 @@
+"""
+Pooled HTTP client for the ESPN site API.
+
+Each Cloud Function deploys only its own directory, so this file is copied
+verbatim into extract_event_info/, parsing_sb_g_info/ and ranking/ — change
+all three together.
+
+The module-level `espn` client is created at import time. Warm instances
+therefore keep their keep-alive connections between invocations instead
+of paying a TCP + TLS handshake per request. Every attempt, including
+retries, goes through a per-host token bucket, so a thread pool cannot
+burst past the rate limit.
+
+    from espn_client import espn
+    data = espn.get_json(SCOREBOARD_URL, params={"dates": "20251101"})
+"""
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+DEFAULT_TIMEOUT = (3.05, 15)    # (connect, read) seconds
+MAX_RETRIES = 3                 # retries after the first attempt
+BACKOFF = 0.5                   # seconds, doubled on every retry (plus jitter)
+MAX_BACKOFF = 30                # cap for backoff and Retry-After waits
+RETRY_STATUS = {429, 500, 502, 503, 504}
+POOL_SIZE = 16                  # keep-alive connections per host
+RATE_PER_HOST = 25.0            # sustained requests per second per host
+BURST_PER_HOST = 25             # requests allowed back to back
+
+HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+    "User-Agent": "ncaaf-tracking-ranking/1.0 (+requests)",
+}
+
+
+class RateLimiter:
+    """Thread-safe token bucket per host."""
+
+    def __init__(self, rate=RATE_PER_HOST, burst=BURST_PER_HOST):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # host -> [tokens, last refill time]
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        """Block until a request to host may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = [tokens - 1, now]
+                    return
+                self._buckets[host] = [tokens, now]
+                wait = (1 - tokens) / self.rate
+            time.sleep(wait)
+
+
+class ESPNClient:
+    """
+    requests.Session with a sized keep-alive pool, gzip negotiation,
+    default timeouts, retries with exponential backoff (honouring
+    Retry-After) and per-host rate limiting. Safe to share across threads.
+    """
+
+    def __init__(self, pool_size=POOL_SIZE, timeout=DEFAULT_TIMEOUT, retries=MAX_RETRIES,
+                 backoff=BACKOFF, rate=RATE_PER_HOST, burst=BURST_PER_HOST):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = RateLimiter(rate, burst)
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _delay(self, attempt, resp=None):
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_BACKOFF)
+        return min(self.backoff * 2 ** attempt * (1 + random.random()), MAX_BACKOFF)
+
+    def get(self, url, params=None, headers=None, timeout=None, retries=None):
+        """
+        GET with retries on timeouts, connection errors, 429 and 5xx.
+        Returns the last response, which may still be an error status once
+        retries run out, so callers check resp.ok. Re-raises the last
+        network error if no attempt got a response.
+        """
+        retries = self.retries if retries is None else retries
+        host = urlsplit(url).netloc
+        for attempt in range(retries + 1):
+            self.limiter.acquire(host)
+            try:
+                resp = self.session.get(url, params=params, headers=headers, timeout=timeout or self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as err:
+                if attempt == retries:
+                    raise
+                reason, delay = type(err).__name__, self._delay(attempt)
+            else:
+                if resp.status_code not in RETRY_STATUS or attempt == retries:
+                    return resp
+                reason, delay = f"HTTP {resp.status_code}", self._delay(attempt, resp)
+                resp.close()
+            print(f"↻ retry {attempt + 1}/{retries} for {url} in {delay:.1f}s after {reason}")
+            time.sleep(delay)
+
+    def get_json(self, url, params=None, **kwargs):
+        """get() and decode JSON; raises requests.HTTPError on an error status."""
+        resp = self.get(url, params=params, **kwargs)
+        resp.raise_for_status()
+        return resp.json()
+
+
+# Module scope: reused by every invocation on a warm instance
+espn = ESPNClient()
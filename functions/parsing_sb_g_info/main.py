@@ -4,7 +4,12 @@ from google.cloud import storage
 import duckdb
 import pandas as pd
 import json
+import time
 import requests  
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from espn_client import POOL_SIZE, espn
+from summary_cache import SummaryCache
 
 # ===== 基本設定 =====
 project_id = 'baratz00-ba882-fall25'
@@ -18,6 +23,11 @@ db_schema = f'{db}.{schema}'
 
 GAME_URL = "https://site.api.espn.com/apis/site/v2/sports/football/college-football/summary?event=" 
 
+# ===== summary fetching (override per run with ?concurrency=&timeout=) =====
+# retries, backoff and rate limiting live in the shared espn client
+FETCH_CONCURRENCY = 8       # summary requests in flight at once
+FETCH_TIMEOUT = 10          # seconds per request
+
 def safe_cast(value, to_type=float, default=0):   # important for scoreboard piece.
 
     if value in ('-', None, ''):
@@ -28,6 +38,53 @@ def safe_cast(value, to_type=float, default=0):   # important for scoreboard pie
         return default
 
 
+def fetch_summary(game_id, timeout=FETCH_TIMEOUT, cache=None):
+    """
+    One game summary through the shared client (which retries timeouts,
+    connection errors, 429 and 5xx) and, when given, the summary cache.
+    Returns the parsed JSON, or None when ESPN still answers with an error
+    or the request keeps failing.
+    """
+    try:
+        if cache is not None:
+            return cache.get(game_id, f"{GAME_URL}{game_id}", timeout=timeout)
+        resp = espn.get(f"{GAME_URL}{game_id}", timeout=timeout)
+    except requests.RequestException as err:
+        print(f"cannot extract boxscore: {game_id} ({type(err).__name__})")
+        return None
+    if not resp.ok:
+        print(f"cannot extract boxscore: {game_id} (HTTP {resp.status_code})")
+        return None
+    return resp.json()
+
+
+def parse_game_team_stats(game_id, competitors, data, ingest_ts_str, source_path, run_id):
+    """Two game_team rows (one per boxscore team) from a summary response."""
+    rows = []
+    for i, box_team in enumerate(data['boxscore']['teams'][:2]):
+        stats = box_team['statistics']
+        rows.append({
+            'event_id': game_id,
+            'team': box_team['team']['id'],  # Can be adjusted if id is not sufficient for joins.
+            'home_away': box_team['homeAway'],
+            'score': competitors[1 - i]['score'],  # from different json, so order is not typical away @ home format.
+            # now for stats
+            'total_yards': safe_cast(stats[3]['displayValue'], int),
+            'third_eff': safe_cast(stats[1]['value'], float),
+            'fourth_eff': safe_cast(stats[2]['value'], float),
+            'yards_per_pass': safe_cast(stats[6]['displayValue'], float),
+            'yards_per_rush': safe_cast(stats[9]['displayValue'], float),
+            'turnovers': safe_cast(stats[11]['displayValue'], int),
+            'fumbles_lost': safe_cast(stats[12]['value'], int),
+            'ints_thrown': safe_cast(stats[13]['value'], int),
+            'top': safe_cast(stats[14]['value'], int),  # how long did the team hold onto the ball?
+            'ingest_timestamp': ingest_ts_str,
+            'source_path': source_path,
+            'run_id': run_id
+        })
+    return rows
+
+
 # ======================================================
 @functions_framework.http
 def task(request):
@@ -63,7 +120,7 @@ def task(request):
     print(f"📦 extract {len(events)} games")
 
     # ---container init ---
-    games, venues, teams_all, game_team_stats = [], [], [], []
+    games, venues, teams_all, summary_jobs = [], [], [], []
     ingest_ts_str = pd.Timestamp.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
     # --- each game ---
@@ -136,77 +193,39 @@ def task(request):
 
         teams_all.append(teams_df)
 
-        # ----- second  -----
-        try:
-            summary_url = f"{GAME_URL}{game_id}"
-            resp = requests.get(summary_url)
-            if resp.ok:
-                data = resp.json()
-                # box = resp.json().get("boxscore", {})
-                # team_stats = box.get("teams", [])
-                # if len(team_stats) == 2:
-                #     for i, side in enumerate(["Away", "Home"]):
-                #         stats = team_stats[i]
-                        # stat_map = {s["name"]: s.get("displayValue") or s.get("value") for s in stats.get("statistics", [])}
-                        # game_team_stats.append({
-                        #     "game_id": int(game_id),
-                        #     "team_id": stats["team"]["id"],
-                        #     "home_away": side,
-                        #     "score": stats.get("score", 0),
-                        #     "total_yards": int(stat_map.get("Total Yards", 0) or 0),
-                        #     "third_eff": float(stat_map.get("3rd Down %", 0) or 0),
-                        #     "fourth_eff": float(stat_map.get("4th Down %", 0) or 0),
-                        #     "yards_per_pass": float(stat_map.get("Yards Per Pass", 0) or 0),
-                        #     "yards_per_rush": float(stat_map.get("Yards Per Rush", 0) or 0),
-                        #     "turnovers": int(stat_map.get("Turnovers", 0) or 0),
-                        #     "fumbles_lost": int(stat_map.get("Fumbles Lost", 0) or 0),
-                        #     "ints_thrown": int(stat_map.get("Interceptions Thrown", 0) or 0),
-                        #     "top": int(stat_map.get("Time of Possession", 0) or 0),
-                        #     "ingest_timestamp": ingest_ts_str,
-                        #     "source_path": source_path,
-                        #     "run_id": run_id
-                        # })
-                game_team_stats.append({
-                    'event_id':game_id,
-                    'team':data['boxscore']['teams'][0]['team']['id'],  # Can be adjusted if id is not sufficient for joins.
-                    'home_away': data['boxscore']['teams'][0]['homeAway'],
-                    'score' : competitors[1]['score'], # from different json, so order is not typical away @ home format.
-                        #now for stats
-                    'total_yards':safe_cast(data['boxscore']['teams'][0]['statistics'][3]['displayValue'], int),
-                    'third_eff':safe_cast(data['boxscore']['teams'][0]['statistics'][1]['value'], float),
-                    'fourth_eff':safe_cast(data['boxscore']['teams'][0]['statistics'][2]['value'], float),
-                    'yards_per_pass':safe_cast(data['boxscore']['teams'][0]['statistics'][6]['displayValue'], float),
-                    'yards_per_rush':safe_cast(data['boxscore']['teams'][0]['statistics'][9]['displayValue'], float),
-                    'turnovers':safe_cast(data['boxscore']['teams'][0]['statistics'][11]['displayValue'], int),
-                    'fumbles_lost':safe_cast(data['boxscore']['teams'][0]['statistics'][12]['value'], int),
-                    'ints_thrown':safe_cast(data['boxscore']['teams'][0]['statistics'][13]['value'], int),
-                    'top':safe_cast(data['boxscore']['teams'][0]['statistics'][14]['value'], int),  # how long did the team hold onto the ball?
-                    'ingest_timestamp':ingest_ts_str,
-                    'source_path':source_path,
-                    'run_id':run_id
-                                        })
-                                        
-                game_team_stats.append({
-                        'event_id':game_id,
-                        'team':data['boxscore']['teams'][1]['team']['id'],  # Can be adjusted if id is not sufficient for joins.
-                        'home_away':data['boxscore']['teams'][1]['homeAway'],
-                        'score': competitors[0]['score'],
-                        'total_yards':safe_cast(data['boxscore']['teams'][1]['statistics'][3]['displayValue'], int),
-                        'third_eff':safe_cast(data['boxscore']['teams'][1]['statistics'][1]['value'], float),
-                        'fourth_eff':safe_cast(data['boxscore']['teams'][1]['statistics'][2]['value'], float),
-                        'yards_per_pass':safe_cast(data['boxscore']['teams'][1]['statistics'][6]['displayValue'], float),
-                        'yards_per_rush':safe_cast(data['boxscore']['teams'][1]['statistics'][9]['displayValue'], float),
-                        'turnovers':safe_cast(data['boxscore']['teams'][1]['statistics'][11]['displayValue'], int),
-                        'fumbles_lost':safe_cast(data['boxscore']['teams'][1]['statistics'][12]['value'], int),
-                        'ints_thrown':safe_cast(data['boxscore']['teams'][1]['statistics'][13]['value'], int),
-                        'top':safe_cast(data['boxscore']['teams'][1]['statistics'][14]['value'], int),  # how long did the team hold onto the ball?
-                        'ingest_timestamp':ingest_ts_str,
-                        'source_path':source_path,
-                        'run_id':run_id})
-            else:
-                print(f"cannot extract boxscore: {game_id}")
-        except Exception as err:
-            print(f"extract {game_id} how many errors: {err}")
+        summary_jobs.append((game_id, competitors, source_path))
+
+    # ----- second: summaries fetched concurrently, parsed as they arrive -----
+    # more threads than pooled connections would just open throwaway sockets
+    concurrency = min(max(1, int(request.args.get("concurrency", FETCH_CONCURRENCY))), POOL_SIZE)
+    timeout = float(request.args.get("timeout", FETCH_TIMEOUT))
+    # final games come from raw/summary/ without a request; ?summary_cache=false refetches all
+    use_cache = request.args.get("summary_cache", "true").lower() != "false"
+    cache = SummaryCache(bucket) if use_cache else None
+    fetch_start = time.perf_counter()
+    stats_by_event = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {
+            pool.submit(fetch_summary, game_id, timeout, cache): (i, game_id, competitors, source_path)
+            for i, (game_id, competitors, source_path) in enumerate(summary_jobs)
+        }
+        for future in as_completed(futures):
+            i, game_id, competitors, source_path = futures[future]
+            try:
+                data = future.result()
+                if data is not None:
+                    stats_by_event[i] = parse_game_team_stats(
+                        game_id, competitors, data, ingest_ts_str, source_path, run_id
+                    )
+            except Exception as err:
+                print(f"extract {game_id} how many errors: {err}")
+    # keep the scoreboard's event order regardless of arrival order
+    game_team_stats = [row for i in sorted(stats_by_event) for row in stats_by_event[i]]
+    print(f"⏱️ {len(stats_by_event)}/{len(summary_jobs)} summaries in "
+          f"{time.perf_counter() - fetch_start:.1f}s ({concurrency} concurrent)")
+    if cache is not None:
+        print(f"🗄️ summary cache: {cache.counts['final_hits']} final hits, "
+              f"{cache.counts['not_modified']} not modified, {cache.counts['fetched']} fetched")
 
     # ---  DataFrame ---
     games_df = pd.DataFrame(games)
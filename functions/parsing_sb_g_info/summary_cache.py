@@ -0,0 +1,147 @@
+"""
+Cache of ESPN game summary responses, on local disk and in GCS under raw/summary/.
+
+Layout (the same relative paths locally and in the bucket):
+    raw/summary/objects/<sha256>.json.gz   gzip'd response body, named by its hash
+    raw/summary/events/<event_id>.json     pointer: sha256, etag, last_modified, final
+
+A summary whose own status is final never changes again, so it is served
+from the cache with no network call. Anything else is revalidated with
+If-None-Match / If-Modified-Since: a 304 reuses the cached body, and a 200
+is stored. Because bodies are content-addressed, a changed pointer that
+refers to an unchanged body re-uploads nothing.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from espn_client import espn
+
+
+SUMMARY_PREFIX = "raw/summary"
+
+# /tmp survives between invocations on a warm Cloud Functions instance
+LOCAL_CACHE_DIR = Path(os.environ.get("SUMMARY_CACHE_DIR", "/tmp/espn_summary"))
+
+
+def summary_is_final(data):
+    """True when the summary's own header says the game is over."""
+    try:
+        status = data["header"]["competitions"][0]["status"]["type"]
+    except (KeyError, IndexError, TypeError):
+        return False
+    return bool(status.get("completed")) or status.get("state") == "post"
+
+
+class SummaryCache:
+    """Summary fetches through the cache; safe to share across fetch threads."""
+
+    def __init__(self, bucket=None, local_dir=LOCAL_CACHE_DIR):
+        self.bucket = bucket
+        self.local_dir = Path(local_dir)
+        self.counts = {"final_hits": 0, "not_modified": 0, "fetched": 0}
+        self._lock = threading.Lock()
+
+    # ----- storage -----
+
+    def _read(self, path):
+        """Bytes at path from local disk, then GCS (copied to local disk on a hit)."""
+        local = self.local_dir / path
+        if local.exists():
+            return local.read_bytes()
+        if self.bucket is not None:
+            blob = self.bucket.blob(path)
+            if blob.exists():
+                data = blob.download_as_bytes()
+                self._write_local(local, data)
+                return data
+        return None
+
+    def _write(self, path, data, content_type, skip_existing=False):
+        local = self.local_dir / path
+        if skip_existing and local.exists():
+            return
+        self._write_local(local, data)
+        if self.bucket is not None:
+            blob = self.bucket.blob(path)
+            if not (skip_existing and blob.exists()):
+                blob.upload_from_string(data, content_type=content_type)
+
+    @staticmethod
+    def _write_local(path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def _pointer_path(self, game_id):
+        return f"{SUMMARY_PREFIX}/events/{game_id}.json"
+
+    def _object_path(self, sha256):
+        return f"{SUMMARY_PREFIX}/objects/{sha256}.json.gz"
+
+    def lookup(self, game_id):
+        """(pointer, body bytes) for a cached event, or (None, None)."""
+        pointer = self._read(self._pointer_path(game_id))
+        if pointer is None:
+            return None, None
+        pointer = json.loads(pointer)
+        body = self._read(self._object_path(pointer["sha256"]))
+        if body is None:
+            return None, None
+        return pointer, gzip.decompress(body)
+
+    def store(self, game_id, body, etag, last_modified, final):
+        sha256 = hashlib.sha256(body).hexdigest()
+        self._write(self._object_path(sha256), gzip.compress(body), "application/gzip", skip_existing=True)
+        pointer = {
+            "event_id": str(game_id),
+            "sha256": sha256,
+            "etag": etag,
+            "last_modified": last_modified,
+            "final": final,
+            "cached_at": pd.Timestamp.utcnow().isoformat(),
+        }
+        self._write(self._pointer_path(game_id), json.dumps(pointer).encode(), "application/json")
+
+    def _count(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    # ----- fetching -----
+
+    def get(self, game_id, url, timeout=None):
+        """
+        Summary JSON for one event: from the cache when final, otherwise via
+        a conditional GET. Returns None when ESPN answers with an error.
+        """
+        pointer, body = self.lookup(game_id)
+        if pointer is not None and pointer["final"]:
+            self._count("final_hits")
+            return json.loads(body)
+
+        headers = {}
+        if pointer is not None:
+            if pointer.get("etag"):
+                headers["If-None-Match"] = pointer["etag"]
+            if pointer.get("last_modified"):
+                headers["If-Modified-Since"] = pointer["last_modified"]
+
+        resp = espn.get(url, headers=headers or None, timeout=timeout)
+        if resp.status_code == 304 and body is not None:
+            self._count("not_modified")
+            return json.loads(body)
+        if not resp.ok:
+            print(f"cannot extract boxscore: {game_id} (HTTP {resp.status_code})")
+            return None
+
+        data = resp.json()
+        self.store(game_id, resp.content, resp.headers.get("ETag"),
+                   resp.headers.get("Last-Modified"), summary_is_final(data))
+        self._count("fetched")
+        return data
@@ -4,11 +4,12 @@ import uuid
 from datetime import datetime
 import duckdb
 import pandas as pd
-import requests
 import io
 from google.cloud import secretmanager
 from google.cloud import storage
 
+from espn_client import espn
+
 # ===== Global Config =====
 project_id = 'baratz00-ba882-fall25'
 secret_id = 'MotherDuck'
@@ -39,7 +40,7 @@ def task(request):
 
     # --- 3️⃣ Fetch ESPN Rankings API ---
     url = "http://site.api.espn.com/apis/site/v2/sports/football/college-football/rankings"
-    response = requests.get(url)
+    response = espn.get(url)
     if not response.ok:
         raise Exception(f"❌ API error: {response.status_code}")
     print("✅ ESPN API connection successful.")